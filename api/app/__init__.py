@@ -2,6 +2,7 @@ from flask import Flask
 from flask_cors import CORS
 from app.config import config
 from app.models.email import db
+from app.models import migrations, sqlite_tuning
 
 def create_app(config_name='default'):
     app = Flask(__name__)
@@ -9,15 +10,24 @@ def create_app(config_name='default'):
     
     # Initialize extensions
     db.init_app(app)
-    CORS(app, resources={r"/*": {"origins": "*"}})
+    CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=['X-Next-Cursor', 'Link', 'ETag', 'X-Sync-Token'])
     
     # Register blueprints
-    from app.routes import prediction, emails
+    from app.routes import prediction, emails, admin
     app.register_blueprint(prediction.bp)
     app.register_blueprint(emails.bp)
+    app.register_blueprint(admin.bp)
     
-    # Create tables
+    # Create tables and bring existing databases up to date
     with app.app_context():
-        db.create_all()
+        sqlite_tuning.install(db.engine, sqlite_tuning.resolve_pragmas(
+            app.config['SQLITE_PRAGMA_PROFILE'], app.config['SQLITE_PRAGMAS']
+        ))
+        # create_all dentro do mesmo lock das migrações (workers subindo juntos)
+        migrations.upgrade(db.engine, db.metadata)
+    
+    # Arquivamento em segundo plano (se configurado), iniciado em cada processo
+    from app.services import archive_service
+    app.before_request(archive_service.ensure_worker)
         
     return app
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from flask import current_app
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.models.email import db
+from app.models import sqlite_tuning
+from app.routes.emails import send_outcome
+from app.services import spam_service, email_service, write_queue, archive_service
+
+# Modo de servir ASGI (asgi.py): um processo com event loop atende milhares de
+# conexões. POST /predict e POST /send rodam como corrotinas (a pontuação vai
+# para o micro-lote ou para um executor, a gravação para a fila write-behind ou
+# para o aiosqlite); as demais rotas, e qualquer payload inválido, vão para as
+# mesmas views Flask em um pool de threads, com os mesmos contratos JSON.
+
+# Corpo maior que isso vai para arquivo temporário (ex.: POST /emails/bulk em NDJSON)
+_SPOOL_SIZE = 1024 * 1024
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+def _path_info(scope):
+    path, root = scope['path'], scope.get('root_path', '')
+    return path[len(root):] if root and path.startswith(root) else path
+
+def _environ(scope, body):
+    """Ambiente WSGI equivalente à requisição ASGI"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': _path_info(scope).encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for key, value in scope['headers']:
+        key = key.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+def _json_body(scope, body):
+    """Corpo JSON da requisição; None se não for JSON válido (a view Flask responde o erro)"""
+    content_type = (_header(scope, b'content-type') or '').split(';', 1)[0].strip().lower()
+    if content_type != 'application/json' and not content_type.endswith('+json'):
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+async def _read_body(receive):
+    body = SpooledTemporaryFile(max_size=_SPOOL_SIZE)
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            return None
+        body.write(message.get('body', b''))
+        if not message.get('more_body'):
+            body.seek(0)
+            return body
+
+async def _respond(send, status, headers, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+class AsgiApp:
+    """
+    Aplicação ASGI sobre o app Flask `app`.
+
+    Rotas nativas (corrotinas) só respondem payloads válidos; o resto segue
+    para a view Flask, e as respostas passam pelo mesmo `process_response`
+    (CORS etc.), então status, corpo e cabeçalhos são os mesmos do modo WSGI.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # Os executores só criam threads no primeiro uso (depois do fork, com preload)
+        self.executor = ThreadPoolExecutor(app.config['ASGI_EXECUTOR_THREADS'],
+                                           thread_name_prefix='asgi-predict')
+        self.wsgi_executor = ThreadPoolExecutor(app.config['ASGI_WSGI_THREADS'],
+                                                thread_name_prefix='asgi-wsgi')
+        self._engine = None
+        self.routes = {
+            ('POST', '/predict'): self._predict,
+            ('POST', '/send'): self._send,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+
+        body = await _read_body(receive)
+        if body is None:
+            return
+        with body:
+            handler = self.routes.get((scope['method'], _path_info(scope)))
+            if handler is not None:
+                data = _json_body(scope, body.read())
+                body.seek(0)
+                if isinstance(data, dict) and await self._native(handler, data, scope, body, send):
+                    return
+
+            loop = asyncio.get_running_loop()
+            status, headers, content = await loop.run_in_executor(
+                self.wsgi_executor, self._call_wsgi, _environ(scope, body)
+            )
+            await _respond(send, status, headers, content)
+
+    async def _native(self, handler, data, scope, body, send):
+        """Responde pela rota nativa; False se o payload deve ir para a view Flask"""
+        with self.app.request_context(_environ(scope, body)):
+            result = await handler(data)
+            if result is None:
+                return False
+            payload, status = result
+            response = self.app.json.response(payload)
+            response.status_code = status
+            response = self.app.process_response(response)
+        await _respond(send, response.status_code, response.headers.items(), response.get_data())
+        return True
+
+    def _call_wsgi(self, environ):
+        response = []
+
+        def start_response(status, headers, exc_info=None):
+            response[:] = [int(status.split(' ', 1)[0]), headers]
+
+        result = self.app(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response[0], response[1], content
+
+    async def _predict(self, data):
+        text = data.get('text')
+        if not isinstance(text, str) or not text.strip():
+            return None
+        try:
+            return await spam_service.predict_async(text, self.executor), 200
+        except ValueError as e:
+            return {'error': str(e)}, 500
+        except Exception as e:
+            return {'error': 'Erro ao processar predição', 'details': str(e)}, 500
+
+    async def _send(self, data):
+        message = data.get('message')
+        if not isinstance(message, str) or not message.strip():
+            return None
+        recipient = data.get('recipient', 'default@example.com')
+        try:
+            result = await spam_service.predict_async(message, self.executor)
+            payload, status, record = send_outcome(message, recipient, result)
+            if record is not None:
+                await self._save_sent(record)
+            return payload, status
+        except ValueError as e:
+            return {'error': str(e)}, 500
+        except Exception as e:
+            return {'error': 'Erro ao enviar mensagem', 'details': str(e)}, 500
+
+    async def _save_sent(self, record):
+        if current_app.config['SEND_WRITE_BEHIND']:
+            # Só enfileira (não bloqueia): a thread da fila grava em grupos
+            if not write_queue.enqueue(record):
+                current_app.logger.warning('Fila de gravação cheia; email enviado não foi salvo')
+            return
+        try:
+            engine = self._async_engine()
+            if engine is not None:
+                await email_service.create_email_async(engine, **record)
+            else:
+                await asyncio.get_running_loop().run_in_executor(
+                    self.wsgi_executor, self._create_email, record
+                )
+        except Exception as e:
+            current_app.logger.error('Falha ao gravar email enviado: %s', e)
+
+    def _create_email(self, record):
+        with self.app.app_context():
+            email_service.create_email(**record)
+
+    def _async_engine(self):
+        """
+        AsyncEngine (aiosqlite) no mesmo arquivo do SQLAlchemy síncrono, com
+        os mesmos PRAGMAs. None fora do SQLite ou com banco em memória (cada
+        conexão veria um banco diferente): aí a gravação vai para o executor.
+        """
+        if self._engine is None:
+            url = db.engine.url
+            if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:'):
+                self._engine = create_async_engine(url.set(drivername='sqlite+aiosqlite'))
+                sqlite_tuning.install(self._engine.sync_engine, sqlite_tuning.resolve_pragmas(
+                    current_app.config['SQLITE_PRAGMA_PROFILE'], current_app.config['SQLITE_PRAGMAS']
+                ))
+            else:
+                self._engine = False
+        return self._engine or None
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # As rotas nativas não passam pelo before_request do Flask
+                with self.app.app_context():
+                    archive_service.ensure_worker()
+                    spam_service.get_detector()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, write_queue.flush)
+                if self._engine:
+                    await self._engine.dispose()
+                self.executor.shutdown(wait=False)
+                self.wsgi_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
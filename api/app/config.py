@@ -10,10 +10,85 @@ class Config:
         f'sqlite:///{DATA_DIR / "emails.db"}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # PRAGMAs do SQLite aplicados a cada conexão: perfil de
+    # app/models/sqlite_tuning.py ('default', 'wal', 'wal_durable') + ajustes
+    SQLITE_PRAGMA_PROFILE = os.environ.get('SQLITE_PRAGMA_PROFILE') or 'wal'
+    SQLITE_PRAGMAS = {}
+    
+    # Paginação de GET /emails
+    EMAILS_PAGE_SIZE = int(os.environ.get('EMAILS_PAGE_SIZE') or 100)
+    EMAILS_MAX_PAGE_SIZE = int(os.environ.get('EMAILS_MAX_PAGE_SIZE') or 1000)
+    
+    # Linhas por transação em POST /emails/bulk
+    EMAILS_BULK_CHUNK_SIZE = int(os.environ.get('EMAILS_BULK_CHUNK_SIZE') or 1000)
+    
+    # Gravação em segundo plano dos emails do POST /send: grupos de até
+    # WRITE_QUEUE_BATCH_SIZE registros ou o que chegar em WRITE_QUEUE_FLUSH_INTERVAL segundos
+    SEND_WRITE_BEHIND = os.environ.get('SEND_WRITE_BEHIND', 'true').lower() in ('1', 'true', 'yes')
+    WRITE_QUEUE_MAX_SIZE = int(os.environ.get('WRITE_QUEUE_MAX_SIZE') or 10000)
+    WRITE_QUEUE_BATCH_SIZE = int(os.environ.get('WRITE_QUEUE_BATCH_SIZE') or 200)
+    WRITE_QUEUE_FLUSH_INTERVAL = float(os.environ.get('WRITE_QUEUE_FLUSH_INTERVAL') or 0.05)
+    
+    # Classificar no servidor os emails importados sem is_spam/spam_score
+    # (pode ser ativado por requisição com ?classify=true)
+    EMAILS_CLASSIFY_ON_INGEST = os.environ.get('EMAILS_CLASSIFY_ON_INGEST', '').lower() in ('1', 'true', 'yes')
+    
+    # Retenção: emails recebidos há mais de EMAILS_RETENTION_DAYS dias são movidos
+    # para arquivos JSONL gzip por dia em EMAILS_ARCHIVE_DIR (0 = manter tudo).
+    # O arquivamento roda pelo script archive_emails.py ou em segundo plano a
+    # cada EMAILS_ARCHIVE_INTERVAL segundos (0 = desativado)
+    EMAILS_RETENTION_DAYS = int(os.environ.get('EMAILS_RETENTION_DAYS') or 0)
+    EMAILS_ARCHIVE_DIR = os.environ.get('EMAILS_ARCHIVE_DIR') or str(DATA_DIR / 'archive')
+    EMAILS_ARCHIVE_BATCH_SIZE = int(os.environ.get('EMAILS_ARCHIVE_BATCH_SIZE') or 5000)
+    EMAILS_ARCHIVE_INTERVAL = float(os.environ.get('EMAILS_ARCHIVE_INTERVAL') or 0)
+    
     # Model paths
+    # MODEL_PATH aceita um pickle (*.pkl, junto com VECTORIZER_PATH) ou um
+    # diretório no formato mapeado em memória (manifest.json + arrays .npy)
     MODEL_PATH = os.environ.get('MODEL_PATH') or str(BASE_DIR / 'spam_model.pkl')
     VECTORIZER_PATH = os.environ.get('VECTORIZER_PATH') or str(BASE_DIR / 'vectorizer.pkl')
 
+    # Intervalo (segundos) para verificar se há um modelo novo em disco; 0 desativa
+    MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL') or 5)
+    
+    # Token exigido no header X-Admin-Token pelos endpoints /admin (vazio = sem token)
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or ''
+
+    # Backend de treino: 'svc' (libsvm), 'linear_svc' (liblinear) ou 'sgd'
+    TRAIN_BACKEND = os.environ.get('TRAIN_BACKEND') or 'svc'
+    
+    # Aprendizado incremental (POST /feedback): as correções são aplicadas
+    # quando o buffer atinge FEEDBACK_BATCH_SIZE ou após FEEDBACK_FLUSH_INTERVAL segundos
+    FEEDBACK_BATCH_SIZE = int(os.environ.get('FEEDBACK_BATCH_SIZE') or 32)
+    FEEDBACK_FLUSH_INTERVAL = float(os.environ.get('FEEDBACK_FLUSH_INTERVAL') or 60)
+    FEEDBACK_LEARNING_RATE = float(os.environ.get('FEEDBACK_LEARNING_RATE') or 0.01)
+    FEEDBACK_ALPHA = float(os.environ.get('FEEDBACK_ALPHA') or 1e-4)
+    FEEDBACK_LOG_PATH = os.environ.get('FEEDBACK_LOG_PATH') or str(DATA_DIR / 'feedback.jsonl')
+    
+    # Jobs de treino assíncronos (POST /train)
+    TRAIN_JOBS_DIR = os.environ.get('TRAIN_JOBS_DIR') or str(DATA_DIR / 'jobs')
+    TRAIN_MAX_WORKERS = int(os.environ.get('TRAIN_MAX_WORKERS') or 1)
+    
+    # Cache de predições por texto normalizado (predict, predict-batch, /send):
+    # até PREDICT_CACHE_SIZE entradas (0 desativa), cada uma por PREDICT_CACHE_TTL segundos (0 = sem prazo)
+    PREDICT_CACHE_SIZE = int(os.environ.get('PREDICT_CACHE_SIZE') or 10000)
+    PREDICT_CACHE_TTL = float(os.environ.get('PREDICT_CACHE_TTL') or 600)
+    
+    # Micro-lotes: chamadas concorrentes de predict (/predict, /send) que chegam
+    # até MICROBATCH_WINDOW segundos depois da primeira (no máximo
+    # MICROBATCH_MAX_SIZE) são pontuadas juntas; 0 desativa. Sem concorrência
+    # a chamada é feita direto, sem esperar a janela
+    MICROBATCH_WINDOW = float(os.environ.get('MICROBATCH_WINDOW') or 0.002)
+    MICROBATCH_MAX_SIZE = int(os.environ.get('MICROBATCH_MAX_SIZE') or 64)
+    
+    # Limite de mensagens por chamada em POST /predict-batch
+    PREDICT_BATCH_MAX_SIZE = int(os.environ.get('PREDICT_BATCH_MAX_SIZE') or 10000)
+
+    # Modo ASGI (asgi.py): threads que pontuam fora do event loop e threads
+    # que atendem as rotas servidas pelas views Flask
+    ASGI_EXECUTOR_THREADS = int(os.environ.get('ASGI_EXECUTOR_THREADS') or 4)
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS') or 16)
+
 class DevelopmentConfig(Config):
     DEBUG = True
 
@@ -23,6 +98,10 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    MODEL_RELOAD_INTERVAL = 0
+    FEEDBACK_LOG_PATH = ''
+    SEND_WRITE_BEHIND = False
+    EMAILS_ARCHIVE_INTERVAL = 0
 
 config = {
     'development': DevelopmentConfig,
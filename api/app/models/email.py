@@ -3,8 +3,24 @@ from datetime import datetime
 
 db = SQLAlchemy()
 
+# Tamanho do trecho do corpo retornado na listagem
+SNIPPET_LENGTH = 200
+
+def _snippet_default(context):
+    # Calculado do body de cada linha inserida (ORM, insert() e executemany)
+    body = context.get_current_parameters().get('body')
+    return body[:SNIPPET_LENGTH] if body is not None else None
+
 class EmailRecord(db.Model):
     __tablename__ = 'emails'
+    # Índices das consultas de listagem (ordenadas por received desc, id desc).
+    # No SQLite o id (INTEGER PRIMARY KEY) é o rowid e já faz parte de todo
+    # índice, então eles cobrem também o desempate da paginação por cursor.
+    __table_args__ = (
+        db.Index('ix_emails_received', 'received'),
+        db.Index('ix_emails_is_spam_received', 'is_spam', 'received'),
+        db.Index('ix_emails_recipient_received', 'recipient', 'received'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     sender = db.Column(db.String(256), nullable=False)
     recipient = db.Column(db.String(256), nullable=False)
@@ -13,6 +29,10 @@ class EmailRecord(db.Model):
     received = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     is_spam = db.Column(db.Boolean, nullable=False, default=False)
     spam_score = db.Column(db.Float, nullable=False, default=0.0)
+    
+    # Início do corpo gravado junto com o email, para a listagem não precisar
+    # ler o body (nem as páginas de overflow de corpos grandes)
+    snippet = db.Column(db.String(SNIPPET_LENGTH), nullable=True, default=_snippet_default)
 
     def to_dict(self):
         return {
@@ -25,3 +45,22 @@ class EmailRecord(db.Model):
             'is_spam': bool(self.is_spam),
             'spam_score': float(self.spam_score)
         }
+
+    def to_summary_dict(self):
+        """Projeção leve para listagens: sem o body, com um trecho inicial"""
+        return {
+            'id': self.id,
+            'sender': self.sender,
+            'recipient': self.recipient,
+            'subject': self.subject,
+            'snippet': self.snippet or '',
+            'received': self.received.isoformat() if self.received else None,
+            'is_spam': bool(self.is_spam),
+            'spam_score': float(self.spam_score)
+        }
+
+# Colunas carregadas pelas listagens (o body fica de fora)
+SUMMARY_COLUMNS = (
+    EmailRecord.id, EmailRecord.sender, EmailRecord.recipient, EmailRecord.subject,
+    EmailRecord.snippet, EmailRecord.received, EmailRecord.is_spam, EmailRecord.spam_score
+)
@@ -0,0 +1,209 @@
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+
+# `db.create_all()` só cria tabelas que não existem: índices, tabelas
+# auxiliares e triggers novos não chegam a bancos já existentes (ex.:
+# data/emails.db). Cada passo aqui é idempotente e roda uma única vez por
+# banco, registrado em `schema_migrations`. Vários workers podem subir ao
+# mesmo tempo sobre um banco novo: no SQLite tudo roda em uma transação
+# BEGIN IMMEDIATE, e quem chega depois espera o lock e relê o que já foi aplicado.
+
+def _create_email_indexes(conn):
+    from app.models.email import EmailRecord
+    for index in EmailRecord.__table__.indexes:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+
+def _create_email_fts(conn):
+    # Índice FTS5 de conteúdo externo: guarda só o índice invertido e lê
+    # subject/body da própria tabela emails; triggers o mantêm em sincronia
+    if conn.dialect.name != 'sqlite':
+        return
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS emails_fts USING fts5("
+        "subject, body, content='emails', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS emails_fts_ai AFTER INSERT ON emails BEGIN "
+        "INSERT INTO emails_fts(rowid, subject, body) VALUES (new.id, new.subject, new.body); "
+        "END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS emails_fts_ad AFTER DELETE ON emails BEGIN "
+        "INSERT INTO emails_fts(emails_fts, rowid, subject, body) VALUES ('delete', old.id, old.subject, old.body); "
+        "END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS emails_fts_au AFTER UPDATE OF subject, body ON emails BEGIN "
+        "INSERT INTO emails_fts(emails_fts, rowid, subject, body) VALUES ('delete', old.id, old.subject, old.body); "
+        "INSERT INTO emails_fts(rowid, subject, body) VALUES (new.id, new.subject, new.body); "
+        "END"
+    )
+    # Indexar as linhas que já existiam
+    conn.exec_driver_sql("INSERT INTO emails_fts(emails_fts) VALUES ('rebuild')")
+
+def _create_email_changes(conn):
+    # Contador de alterações em emails, incrementado por triggers a cada
+    # INSERT/UPDATE/DELETE: vira o ETag de GET /emails sem varrer a tabela
+    if conn.dialect.name != 'sqlite':
+        return
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS emails_changes ("
+        "id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)"
+    )
+    conn.exec_driver_sql("INSERT OR IGNORE INTO emails_changes (id, version) VALUES (1, 0)")
+    for name, event in (('ai', 'INSERT'), ('ad', 'DELETE'), ('au', 'UPDATE')):
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS emails_changes_{name} AFTER {event} ON emails BEGIN "
+            "UPDATE emails_changes SET version = version + 1 WHERE id = 1; "
+            "END"
+        )
+
+# Faixas de spam_score em emails_score_stats: [0, 0.1), [0.1, 0.2), ..., [0.9, 1]
+SCORE_BUCKETS = 10
+
+def _score_bucket(score):
+    return f"MAX(0, MIN({SCORE_BUCKETS - 1}, CAST({score} * {SCORE_BUCKETS} AS INTEGER)))"
+
+def _stats_upsert(row):
+    return (
+        "INSERT INTO emails_daily_stats (day, total, spam, score_sum) "
+        f"VALUES (date({row}.received), 1, {row}.is_spam, {row}.spam_score) "
+        "ON CONFLICT(day) DO UPDATE SET total = total + 1, spam = spam + excluded.spam, "
+        "score_sum = score_sum + excluded.score_sum; "
+        "INSERT INTO emails_score_stats (bucket, total, spam) "
+        f"VALUES ({_score_bucket(row + '.spam_score')}, 1, {row}.is_spam) "
+        "ON CONFLICT(bucket) DO UPDATE SET total = total + 1, spam = spam + excluded.spam; "
+    )
+
+def _stats_remove(row):
+    return (
+        f"UPDATE emails_daily_stats SET total = total - 1, spam = spam - {row}.is_spam, "
+        f"score_sum = score_sum - {row}.spam_score WHERE day = date({row}.received); "
+        f"DELETE FROM emails_daily_stats WHERE day = date({row}.received) AND total <= 0; "
+        f"UPDATE emails_score_stats SET total = total - 1, spam = spam - {row}.is_spam "
+        f"WHERE bucket = {_score_bucket(row + '.spam_score')}; "
+    )
+
+def _create_email_stats(conn):
+    # Agregados por dia e por faixa de spam_score, mantidos por triggers a cada
+    # alteração em emails: GET /emails/stats lê poucas linhas em vez de varrer a tabela
+    if conn.dialect.name != 'sqlite':
+        return
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS emails_daily_stats ("
+        "day TEXT PRIMARY KEY NOT NULL, total INTEGER NOT NULL, spam INTEGER NOT NULL, "
+        "score_sum REAL NOT NULL)"
+    )
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS emails_score_stats ("
+        "bucket INTEGER PRIMARY KEY, total INTEGER NOT NULL, spam INTEGER NOT NULL)"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS emails_stats_ai AFTER INSERT ON emails BEGIN "
+        + _stats_upsert('new') + "END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS emails_stats_ad AFTER DELETE ON emails BEGIN "
+        + _stats_remove('old') + "END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS emails_stats_au AFTER UPDATE OF received, is_spam, spam_score "
+        "ON emails BEGIN " + _stats_remove('old') + _stats_upsert('new') + "END"
+    )
+    # Agregar as linhas que já existiam
+    conn.exec_driver_sql("DELETE FROM emails_daily_stats")
+    conn.exec_driver_sql("DELETE FROM emails_score_stats")
+    conn.exec_driver_sql(
+        "INSERT INTO emails_daily_stats (day, total, spam, score_sum) "
+        "SELECT date(received), COUNT(*), SUM(is_spam), SUM(spam_score) FROM emails GROUP BY 1"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO emails_score_stats (bucket, total, spam) "
+        f"SELECT {_score_bucket('spam_score')}, "
+        "COUNT(*), SUM(is_spam) FROM emails GROUP BY 1"
+    )
+
+def _create_email_archive_index(conn):
+    # id -> dia dos emails movidos para o arquivo (app/services/archive_service.py)
+    if conn.dialect.name != 'sqlite':
+        return
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS emails_archived (id INTEGER PRIMARY KEY, day TEXT NOT NULL)"
+    )
+
+def _add_email_snippet(conn):
+    # Coluna snippet (início do body), gravada na inserção: a listagem não lê o
+    # body. Em bancos novos create_all já criou a coluna; nos antigos ela é
+    # adicionada e preenchida a partir do body das linhas existentes
+    from app.models.email import SNIPPET_LENGTH
+    columns = {column['name'] for column in inspect(conn).get_columns('emails')}
+    if 'snippet' not in columns:
+        conn.exec_driver_sql(f'ALTER TABLE emails ADD COLUMN snippet VARCHAR({SNIPPET_LENGTH})')
+    conn.execute(
+        text('UPDATE emails SET snippet = substr(body, 1, :n) WHERE snippet IS NULL AND body IS NOT NULL'),
+        {'n': SNIPPET_LENGTH}
+    )
+    if conn.dialect.name == 'sqlite':
+        # Quem alterar o body direto no banco mantém o snippet em dia
+        conn.exec_driver_sql(
+            "CREATE TRIGGER IF NOT EXISTS emails_snippet_au AFTER UPDATE OF body ON emails BEGIN "
+            f"UPDATE emails SET snippet = substr(new.body, 1, {SNIPPET_LENGTH}) WHERE id = new.id; "
+            "END"
+        )
+
+def _keep_archived_in_stats(conn):
+    # Arquivar não é apagar: a remoção de uma linha já registrada em
+    # emails_archived (o arquivador grava lá antes do DELETE, na mesma
+    # transação) não desconta das estatísticas
+    if conn.dialect.name != 'sqlite':
+        return
+    conn.exec_driver_sql("DROP TRIGGER IF EXISTS emails_stats_ad")
+    conn.exec_driver_sql(
+        "CREATE TRIGGER emails_stats_ad AFTER DELETE ON emails "
+        "WHEN NOT EXISTS (SELECT 1 FROM emails_archived WHERE id = old.id) BEGIN "
+        + _stats_remove('old') + "END"
+    )
+
+MIGRATIONS = [
+    (1, 'índices de listagem em emails', _create_email_indexes),
+    (2, 'busca textual FTS5 em emails', _create_email_fts),
+    (3, 'contador de alterações em emails', _create_email_changes),
+    (4, 'estatísticas agregadas de emails', _create_email_stats),
+    (5, 'índice de emails arquivados', _create_email_archive_index),
+    (6, 'coluna snippet em emails', _add_email_snippet),
+    (7, 'emails arquivados continuam nas estatísticas', _keep_archived_in_stats),
+]
+
+def upgrade(engine, metadata=None):
+    """
+    Cria as tabelas de `metadata` que faltam e aplica as migrações pendentes,
+    em ordem, em uma única transação. Retorna as versões aplicadas.
+    """
+    sqlite = engine.dialect.name == 'sqlite'
+    insert = 'INSERT OR IGNORE' if sqlite else 'INSERT'
+    applied = []
+    with engine.connect() as conn:
+        if sqlite:
+            # Lock de escrita antes de ler schema_migrations (espera até o busy_timeout)
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+        if metadata is not None:
+            metadata.create_all(bind=conn)
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version INTEGER PRIMARY KEY, name VARCHAR(256) NOT NULL, applied DATETIME NOT NULL)'
+        ))
+        done = {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+        for version, name, step in MIGRATIONS:
+            if version in done:
+                continue
+            step(conn)
+            conn.execute(
+                text(f'{insert} INTO schema_migrations (version, name, applied) VALUES (:v, :n, :a)'),
+                {'v': version, 'n': name, 'a': datetime.now()}
+            )
+            applied.append(version)
+        conn.commit()
+    return applied
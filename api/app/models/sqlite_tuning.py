@@ -0,0 +1,52 @@
+from sqlalchemy import event
+
+# Perfis de PRAGMA aplicados a cada conexão nova do SQLite.
+# - default: padrões do SQLite (journal de rollback, synchronous=FULL, sem mmap)
+# - wal: leitores não bloqueiam o escritor; synchronous=NORMAL é seguro em WAL
+#   (pode perder as últimas transações em queda de energia, nunca corrompe)
+# - wal_durable: WAL mantendo synchronous=FULL
+# auto_vacuum=INCREMENTAL só vale para bancos novos (antes da primeira tabela e
+# do journal_mode); permite devolver o espaço liberado pelo arquivamento sem VACUUM completo
+PRAGMA_PROFILES = {
+    'default': {},
+    'wal': {
+        'busy_timeout': 5000,
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    },
+    'wal_durable': {
+        'busy_timeout': 5000,
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    },
+}
+
+def resolve_pragmas(profile, overrides=None):
+    if profile not in PRAGMA_PROFILES:
+        raise ValueError(f"Perfil de PRAGMA desconhecido: {profile}")
+    pragmas = dict(PRAGMA_PROFILES[profile])
+    pragmas.update(overrides or {})
+    return pragmas
+
+def install(engine, pragmas):
+    """Registra um listener que aplica `pragmas` em toda conexão nova do engine"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # busy_timeout primeiro: trocar o journal_mode também disputa o lock
+            for name in sorted(pragmas, key=lambda n: n != 'busy_timeout'):
+                cursor.execute(f'PRAGMA {name}={pragmas[name]}')
+        finally:
+            cursor.close()
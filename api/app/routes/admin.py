@@ -0,0 +1,75 @@
+from flask import Blueprint, request, jsonify, current_app
+from app.services import spam_service, write_queue
+
+bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+@bp.before_request
+def check_token():
+    token = current_app.config.get('ADMIN_TOKEN')
+    if token and request.headers.get('X-Admin-Token') != token:
+        return jsonify({'error': 'Não autorizado'}), 401
+
+@bp.route('/model', methods=['GET'])
+def model_status():
+    """Versão do modelo ativo e do modelo em disco"""
+    try:
+        status = spam_service.get_model_status()
+        status['feedback'] = spam_service.get_feedback_status()
+        return jsonify(status), 200
+    except Exception as e:
+        return jsonify({'error': 'Erro ao obter status do modelo', 'details': str(e)}), 500
+
+@bp.route('/reload-model', methods=['POST'])
+def reload_model():
+    """
+    Recarregar o modelo do disco sem reiniciar o servidor
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = spam_service.reload_model(force=bool(data.get('force', False)))
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': 'Erro ao recarregar modelo', 'details': str(e)}), 500
+
+@bp.route('/apply-feedback', methods=['POST'])
+def apply_feedback():
+    """
+    Aplicar as correções pendentes sem esperar o lote ou o intervalo
+    """
+    try:
+        return jsonify(spam_service.apply_feedback()), 200
+    except Exception as e:
+        return jsonify({'error': 'Erro ao aplicar feedback', 'details': str(e)}), 500
+
+@bp.route('/write-queue', methods=['GET'])
+def write_queue_stats():
+    """Contadores da fila de gravação em segundo plano do POST /send"""
+    stats = write_queue.get_stats()
+    if stats is None:
+        return jsonify({'active': False}), 200
+    stats['active'] = True
+    return jsonify(stats), 200
+
+@bp.route('/predict-cache', methods=['GET'])
+def predict_cache_stats():
+    """Contadores do cache de predições (acertos, faltas, descartes)"""
+    try:
+        stats = spam_service.get_cache_stats()
+        if stats is None:
+            return jsonify({'active': False}), 200
+        stats['active'] = True
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({'error': 'Erro ao obter estatísticas do cache', 'details': str(e)}), 500
+
+@bp.route('/microbatch', methods=['GET'])
+def microbatch_stats():
+    """Fila, tamanho dos lotes e espera adicionada pelos micro-lotes de predict"""
+    try:
+        stats = spam_service.get_batcher_stats()
+        if stats is None:
+            return jsonify({'active': False}), 200
+        stats['active'] = True
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({'error': 'Erro ao obter estatísticas dos micro-lotes', 'details': str(e)}), 500
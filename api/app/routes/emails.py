@@ -1,6 +1,7 @@
-from flask import Blueprint, request, jsonify
-from app.services import spam_service, email_service
+from flask import Blueprint, request, jsonify, current_app, url_for
+from app.services import spam_service, email_service, write_queue, archive_service
 from datetime import datetime
+import json
 import os
 
 bp = Blueprint('emails', __name__)
@@ -24,82 +25,358 @@ def send_message():
         
         # Fazer predição
         result = spam_service.predict(message)
-        
-        # Se for spam, bloquear
-        if result['label'] == 'spam':
-            return jsonify({
-                'status': 'blocked',
-                'reason': 'Mensagem identificada como spam',
-                'confidence': result['confidence'],
-                'message': message[:100] + '...' if len(message) > 100 else message
-            }), 403
+        payload, status, record = send_outcome(message, recipient, result)
         
         # Se for ham, simular envio e salvar
-        try:
-            email_service.create_email(
-                sender='me@example.com',
-                recipient=recipient,
-                subject=('(sent) ' + message[:60]) if message else '(sent)',
-                body=message,
-                is_spam=(result['label'] == 'spam'),
-                spam_score=result.get('confidence', 0.0)
-            )
-        except Exception:
-            pass
+        if record is not None:
+            if current_app.config['SEND_WRITE_BEHIND']:
+                # A gravação fica com a fila em segundo plano; a resposta não espera o commit
+                if not write_queue.enqueue(record):
+                    current_app.logger.warning('Fila de gravação cheia; email enviado não foi salvo')
+            else:
+                try:
+                    email_service.create_email(**record)
+                except Exception as e:
+                    current_app.logger.error('Falha ao gravar email enviado: %s', e)
             
-        return jsonify({
-            'status': 'sent',
-            'message_id': f"msg_{os.urandom(8).hex()}",
-            'recipient': recipient,
-            'message': message[:100] + '...' if len(message) > 100 else message,
-            'timestamp': datetime.now().isoformat()
-        }), 200
+        return jsonify(payload), status
     
     except ValueError as e:
         return jsonify({'error': str(e)}), 500
     except Exception as e:
         return jsonify({'error': 'Erro ao enviar mensagem', 'details': str(e)}), 500
 
+def send_outcome(message, recipient, result):
+    """
+    Resposta de POST /send para uma predição já feita: (payload, status,
+    registro a gravar ou None se bloqueado). Usada também pelo modo ASGI.
+    """
+    preview = message[:100] + '...' if len(message) > 100 else message
+    
+    # Se for spam, bloquear
+    if result['label'] == 'spam':
+        return {
+            'status': 'blocked',
+            'reason': 'Mensagem identificada como spam',
+            'confidence': result['confidence'],
+            'message': preview
+        }, 403, None
+    
+    record = {
+        'sender': 'me@example.com',
+        'recipient': recipient,
+        'subject': ('(sent) ' + message[:60]) if message else '(sent)',
+        'body': message,
+        'received': datetime.now(),
+        'is_spam': (result['label'] == 'spam'),
+        'spam_score': result.get('confidence', 0.0)
+    }
+    return {
+        'status': 'sent',
+        'message_id': f"msg_{os.urandom(8).hex()}",
+        'recipient': recipient,
+        'message': preview,
+        'timestamp': datetime.now().isoformat()
+    }, 200, record
+
+def _parse_bool(value):
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in ('1', 'true', 'yes', 'sim'):
+        return True
+    if value in ('0', 'false', 'no', 'nao', 'não'):
+        return False
+    raise ValueError(f'Valor booleano inválido: {value}')
+
 @bp.route('/emails', methods=['GET'])
 def list_emails():
-    """List all stored emails"""
+    """
+    List stored emails, newest first, one page per call.
+
+    Items carry a short `snippet` instead of the full body; use
+    GET /emails/<id> for the complete record.
+
+    Query params: limit, cursor, is_spam, recipient, since (ISO date).
+    The cursor for the next page is returned in the X-Next-Cursor header.
+
+    Responses carry an ETag (the emails change counter); a request whose
+    If-None-Match matches it gets 304 without touching the table. The
+    X-Sync-Token header holds the highest id covered by the response: pass
+    it back as `since_id` to receive only emails inserted afterwards, in
+    insertion order (`cursor` and `since` are ignored in that mode).
+    """
     try:
-        records = email_service.get_all_emails()
-        return jsonify([r.to_dict() for r in records]), 200
+        try:
+            default_limit = current_app.config['EMAILS_PAGE_SIZE']
+            max_limit = current_app.config['EMAILS_MAX_PAGE_SIZE']
+            limit = int(request.args.get('limit', default_limit))
+            if limit < 1:
+                raise ValueError('Parâmetro "limit" deve ser positivo')
+            limit = min(limit, max_limit)
+            
+            is_spam = _parse_bool(request.args.get('is_spam'))
+            since = request.args.get('since')
+            since = datetime.fromisoformat(since) if since else None
+            since_id = request.args.get('since_id')
+            since_id = int(since_id) if since_id else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Lidos antes da consulta: se algo for inserido no meio, o cliente
+        # só recebe de novo o que já tem, nunca perde uma linha
+        version = email_service.change_version()
+        etag = str(version) if version is not None else None
+        if etag and request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        recipient = request.args.get('recipient') or None
+        args = request.args.to_dict()
+        next_link = None
+        if since_id is not None:
+            records, has_more = email_service.list_emails_since(
+                since_id, limit=limit, is_spam=is_spam, recipient=recipient
+            )
+            sync_token = records[-1].id if records else since_id
+            if has_more:
+                args['since_id'] = sync_token
+                next_link = url_for('emails.list_emails', **args)
+        else:
+            sync_token = email_service.max_email_id()
+            records, next_cursor = email_service.list_emails(
+                limit=limit,
+                cursor=request.args.get('cursor') or None,
+                is_spam=is_spam,
+                recipient=recipient,
+                since=since
+            )
+        
+        response = jsonify([r.to_summary_dict() for r in records])
+        if since_id is None and next_cursor:
+            args['cursor'] = next_cursor
+            response.headers['X-Next-Cursor'] = next_cursor
+            next_link = url_for('emails.list_emails', **args)
+        if next_link:
+            response.headers['Link'] = f'<{next_link}>; rel="next"'
+        response.headers['X-Sync-Token'] = str(sync_token)
+        if etag:
+            response.set_etag(etag)
+            # Sempre revalidar com o servidor (barato: 304 sem corpo)
+            response.headers['Cache-Control'] = 'no-cache'
+        return response, 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Erro ao listar emails', 'details': str(e)}), 500
 
+def _email_from_json(data):
+    """Converte o JSON de um email nos campos de EmailRecord"""
+    if not isinstance(data, dict):
+        raise ValueError('Registro deve ser um objeto JSON')
+    
+    received = data.get('received')
+    if received:
+        try:
+            received_dt = datetime.fromisoformat(received)
+        except Exception:
+            received_dt = datetime.now()
+    else:
+        received_dt = datetime.now()
+    
+    try:
+        spam_score = float(data.get('spam_score', 0.0))
+    except (TypeError, ValueError):
+        raise ValueError('Campo "spam_score" deve ser numérico')
+    
+    # Sem is_spam nem spam_score o registro fica sem pontuação (None) e é
+    # classificado no servidor ou recebe os valores padrão na gravação
+    scored = 'is_spam' in data or 'spam_score' in data
+    
+    return {
+        'sender': data.get('sender', 'unknown'),
+        'recipient': data.get('recipient', 'unknown'),
+        'subject': data.get('subject', ''),
+        'body': data.get('body', ''),
+        'received': received_dt,
+        'is_spam': bool(data.get('is_spam', False)) if scored else None,
+        'spam_score': spam_score if scored else None
+    }
+
+def _classifier():
+    """
+    Função de classificação em lote para a importação, ou None.
+
+    Ativada por ?classify=true ou por EMAILS_CLASSIFY_ON_INGEST.
+    """
+    classify = _parse_bool(request.args.get('classify'))
+    if classify is None:
+        classify = current_app.config['EMAILS_CLASSIFY_ON_INGEST']
+    if not classify:
+        return None
+    if not spam_service.is_model_loaded():
+        raise ValueError('Modelo não carregado. Treine o modelo primeiro.')
+    return spam_service.predict_batch
+
+@bp.route('/emails/search', methods=['GET'])
+def search_emails():
+    """
+    Full-text search over subject/body, best matches first.
+
+    Query params: q (required; words are ANDed, `word*` matches a prefix),
+    limit, cursor, is_spam. The next cursor comes in X-Next-Cursor.
+    """
+    try:
+        try:
+            q = (request.args.get('q') or '').strip()
+            if not q:
+                raise ValueError('Parâmetro "q" é obrigatório')
+            
+            default_limit = current_app.config['EMAILS_PAGE_SIZE']
+            max_limit = current_app.config['EMAILS_MAX_PAGE_SIZE']
+            limit = int(request.args.get('limit', default_limit))
+            if limit < 1:
+                raise ValueError('Parâmetro "limit" deve ser positivo')
+            limit = min(limit, max_limit)
+            
+            cursor = request.args.get('cursor')
+            offset = int(cursor) if cursor else 0
+            if offset < 0:
+                raise ValueError('Cursor inválido')
+            
+            is_spam = _parse_bool(request.args.get('is_spam'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not email_service.fts_available():
+            return jsonify({'error': 'Busca textual disponível apenas com SQLite (FTS5)'}), 501
+        
+        results, next_offset = email_service.search_emails(q, limit=limit, offset=offset, is_spam=is_spam)
+        
+        payload = []
+        for record, rank, snippet in results:
+            item = record.to_summary_dict()
+            item['rank'] = float(rank)
+            item['snippet'] = snippet
+            payload.append(item)
+        
+        response = jsonify(payload)
+        if next_offset is not None:
+            args = request.args.to_dict()
+            args['cursor'] = str(next_offset)
+            response.headers['X-Next-Cursor'] = str(next_offset)
+            response.headers['Link'] = f'<{url_for("emails.search_emails", **args)}>; rel="next"'
+        return response, 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Erro ao buscar emails', 'details': str(e)}), 500
+
+@bp.route('/emails/stats', methods=['GET'])
+def email_stats():
+    """
+    Mailbox statistics: totals, spam ratio, per-day histogram and spam-score
+    distribution, read from summary tables maintained on insert.
+
+    Query params: since, until (ISO dates; bound the per-day histogram).
+    """
+    try:
+        try:
+            since = request.args.get('since')
+            since = datetime.fromisoformat(since).date() if since else None
+            until = request.args.get('until')
+            until = datetime.fromisoformat(until).date() if until else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not email_service.stats_available():
+            return jsonify({'error': 'Estatísticas disponíveis apenas com SQLite'}), 501
+        
+        return jsonify(email_service.get_stats(since=since, until=until)), 200
+    except Exception as e:
+        return jsonify({'error': 'Erro ao obter estatísticas', 'details': str(e)}), 500
+
+@bp.route('/emails/<int:email_id>', methods=['GET'])
+def get_email(email_id):
+    """Get one stored email, including the full body (archived ones too)"""
+    try:
+        record = email_service.get_email(email_id)
+        if record is not None:
+            return jsonify(record.to_dict()), 200
+        archived = archive_service.get_archived_email(email_id, current_app.config['EMAILS_ARCHIVE_DIR'])
+        if archived is not None:
+            return jsonify(archived), 200
+        return jsonify({'error': f'Email não encontrado: {email_id}'}), 404
+    except Exception as e:
+        return jsonify({'error': 'Erro ao obter email', 'details': str(e)}), 500
+
 @bp.route('/emails', methods=['POST'])
 def create_email():
-    """Create/store an email record"""
+    """Create/store an email record (?classify=true scores it server-side)"""
     try:
         data = request.get_json() or {}
-        sender = data.get('sender', 'unknown')
-        recipient = data.get('recipient', 'unknown')
-        subject = data.get('subject', '')
-        body = data.get('body', '')
-        received = data.get('received')
-        is_spam = bool(data.get('is_spam', False))
-        spam_score = float(data.get('spam_score', 0.0))
+        mapping = _email_from_json(data)
+        email_service.fill_scores([mapping], _classifier())
+        rec = email_service.create_email(**mapping)
+        return jsonify(rec.to_dict()), 201
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Erro ao criar email', 'details': str(e)}), 500
 
-        if received:
+def _iter_bulk_records():
+    """
+    Registros de POST /emails/bulk como `(índice, mapping ou erro)`.
+
+    NDJSON é lido linha a linha do stream, sem carregar o corpo inteiro.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl', 'application/ndjson'):
+        index = 0
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
             try:
-                received_dt = datetime.fromisoformat(received)
-            except Exception:
-                received_dt = datetime.now()
-        else:
-            received_dt = datetime.now()
+                yield index, _email_from_json(json.loads(line))
+            except Exception as e:
+                yield index, ValueError(str(e))
+            index += 1
+        return
+    
+    data = request.get_json()
+    if not isinstance(data, list):
+        raise ValueError('Corpo deve ser um array JSON ou NDJSON (application/x-ndjson)')
+    for index, item in enumerate(data):
+        try:
+            yield index, _email_from_json(item)
+        except Exception as e:
+            yield index, ValueError(str(e))
+
+@bp.route('/emails/bulk', methods=['POST'])
+def bulk_create_emails():
+    """
+    Store many email records at once (JSON array or NDJSON stream).
 
-        rec = email_service.create_email(
-            sender=sender,
-            recipient=recipient,
-            subject=subject,
-            body=body,
-            received=received_dt,
-            is_spam=is_spam,
-            spam_score=spam_score
+    Records are inserted in chunks, one transaction per chunk; invalid
+    records are reported by index and do not abort the batch. With
+    ?classify=true, records without is_spam/spam_score are scored
+    server-side, one vectorized pass per chunk.
+    """
+    try:
+        classify = _classifier()
+        records = _iter_bulk_records()
+        inserted, errors = email_service.bulk_create_emails(
+            records, chunk_size=current_app.config['EMAILS_BULK_CHUNK_SIZE'], classify=classify
         )
-        return jsonify(rec.to_dict()), 201
+        return jsonify({
+            'inserted': inserted,
+            'failed': len(errors),
+            'errors': errors
+        }), 200
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': 'Erro ao criar email', 'details': str(e)}), 500
+        return jsonify({'error': 'Erro ao importar emails', 'details': str(e)}), 500
@@ -1,5 +1,6 @@
-from flask import Blueprint, request, jsonify
-from app.services import spam_service
+from flask import Blueprint, request, jsonify, current_app
+from app.services import spam_service, training_service
+from app.utils.spam_detector import TRAIN_BACKENDS
 import os
 
 bp = Blueprint('prediction', __name__)
@@ -33,6 +34,38 @@ def predict():
     except Exception as e:
         return jsonify({'error': 'Erro ao processar predição', 'details': str(e)}), 500
 
+@bp.route('/predict-batch', methods=['POST'])
+def predict_batch():
+    """
+    Classificar várias mensagens em uma única chamada
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or 'texts' not in data:
+            return jsonify({'error': 'Campo "texts" é obrigatório'}), 400
+        
+        texts = data['texts']
+        
+        if not isinstance(texts, list) or not texts:
+            return jsonify({'error': 'Campo "texts" deve ser uma lista não vazia'}), 400
+        
+        max_size = current_app.config['PREDICT_BATCH_MAX_SIZE']
+        if len(texts) > max_size:
+            return jsonify({'error': f'Máximo de {max_size} mensagens por chamada'}), 413
+        
+        for i, text in enumerate(texts):
+            if not isinstance(text, str) or not text.strip():
+                return jsonify({'error': f'Texto inválido na posição {i}'}), 400
+        
+        results = spam_service.predict_batch(texts)
+        return jsonify({'count': len(results), 'results': results}), 200
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        return jsonify({'error': 'Erro ao processar predição', 'details': str(e)}), 500
+
 @bp.route('/predict-explain', methods=['POST'])
 def predict_explain():
     """
@@ -57,6 +90,79 @@ def predict_explain():
     except Exception as e:
         return jsonify({'error': 'Erro ao processar predição', 'details': str(e)}), 500
 
+@bp.route('/predict-explain-batch', methods=['POST'])
+def predict_explain_batch():
+    """
+    Classificar várias mensagens com as k palavras que mais pesaram para
+    cada lado (top_positive: spam, top_negative: ham)
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or 'texts' not in data:
+            return jsonify({'error': 'Campo "texts" é obrigatório'}), 400
+        
+        texts = data['texts']
+        
+        if not isinstance(texts, list) or not texts:
+            return jsonify({'error': 'Campo "texts" deve ser uma lista não vazia'}), 400
+        
+        max_size = current_app.config['PREDICT_BATCH_MAX_SIZE']
+        if len(texts) > max_size:
+            return jsonify({'error': f'Máximo de {max_size} mensagens por chamada'}), 413
+        
+        for i, text in enumerate(texts):
+            if not isinstance(text, str) or not text.strip():
+                return jsonify({'error': f'Texto inválido na posição {i}'}), 400
+        
+        k = data.get('k', 10)
+        if not isinstance(k, int) or isinstance(k, bool) or not 1 <= k <= 100:
+            return jsonify({'error': 'Campo "k" deve ser um inteiro entre 1 e 100'}), 400
+        
+        results = spam_service.predict_with_explanation_batch(texts, k=k)
+        return jsonify({'count': len(results), 'results': results}), 200
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        return jsonify({'error': 'Erro ao processar predição', 'details': str(e)}), 500
+
+@bp.route('/feedback', methods=['POST'])
+def feedback():
+    """
+    Registrar correções de classificação para aprendizado incremental
+    """
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'Campos "text" e "label" (ou "items") são obrigatórios'}), 400
+        
+        raw_items = data['items'] if 'items' in data else [data]
+        if not isinstance(raw_items, list) or not raw_items:
+            return jsonify({'error': 'Campo "items" deve ser uma lista não vazia'}), 400
+        
+        items = []
+        for i, item in enumerate(raw_items):
+            text = item.get('text') if isinstance(item, dict) else None
+            label = item.get('label') if isinstance(item, dict) else None
+            if not isinstance(text, str) or not text.strip():
+                return jsonify({'error': f'Texto inválido na posição {i}'}), 400
+            if not isinstance(label, str):
+                return jsonify({'error': f'Rótulo inválido na posição {i}'}), 400
+            items.append((text, label))
+        
+        if not spam_service.is_model_loaded():
+            return jsonify({'error': 'Modelo não carregado. Treine o modelo primeiro.'}), 400
+        
+        pending = spam_service.add_feedback(items)
+        return jsonify({'accepted': len(items), 'pending': pending}), 202
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Erro ao registrar feedback', 'details': str(e)}), 500
+
 @bp.route('/metrics', methods=['GET'])
 def metrics():
     """Retornar métricas do modelo treinado"""
@@ -66,14 +172,19 @@ def metrics():
         if not metrics:
             return jsonify({'error': 'Modelo não foi treinado ainda'}), 400
         
-        return jsonify({
+        response = {
             'accuracy': metrics['accuracy'],
             'precision': metrics['precision'],
             'recall': metrics['recall'],
             'f1_score': metrics['f1'],
             'confusion_matrix': metrics['confusion_matrix'],
             'classification_report': metrics['classification_report']
-        }), 200
+        }
+        if 'base_version' in metrics:
+            # Modelo atualizado por feedback: métricas do treino em base_version
+            response['base_version'] = metrics['base_version']
+            response['feedback_applied'] = metrics['feedback_applied']
+        return jsonify(response), 200
     
     except Exception as e:
         return jsonify({'error': 'Erro ao obter métricas', 'details': str(e)}), 500
@@ -94,30 +205,35 @@ def train():
         if not os.path.exists(csv_path):
             return jsonify({'error': f'Arquivo não encontrado: {csv_path}'}), 400
         
-        # Carregar dados
-        X, y = spam_service.load_data(csv_path)
-        
-        # Treinar modelo
-        spam_service.train(X, y)
+        backend = data.get('backend')
+        if backend is not None and backend not in TRAIN_BACKENDS:
+            return jsonify({'error': f'Backend inválido. Opções: {", ".join(TRAIN_BACKENDS)}'}), 400
         
-        # Salvar modelo
-        spam_service.save_model()
-        
-        metrics = spam_service.get_metrics()
+        # O treino roda em outro processo; a resposta volta imediatamente
+        job = training_service.submit(csv_path, backend=backend)
         
         return jsonify({
-            'message': 'Modelo treinado com sucesso',
-            'accuracy': metrics['accuracy'],
-            'precision': metrics['precision'],
-            'recall': metrics['recall'],
-            'f1_score': metrics['f1']
-        }), 200
+            'message': 'Treinamento enfileirado',
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'status_url': f"/train/{job['job_id']}"
+        }), 202
     
-    except FileNotFoundError as e:
-        return jsonify({'error': f'Arquivo não encontrado: {str(e)}'}), 404
     except Exception as e:
         return jsonify({'error': 'Erro ao treinar modelo', 'details': str(e)}), 500
 
+@bp.route('/train/<job_id>', methods=['GET'])
+def train_status(job_id):
+    """
+    Progresso, métricas e local do artefato de um job de treino
+    """
+    job = training_service.get_job(job_id)
+    
+    if job is None:
+        return jsonify({'error': f'Job não encontrado: {job_id}'}), 404
+    
+    return jsonify(job), 200
+
 @bp.route('/info', methods=['GET'])
 def info():
     """Informações sobre a API"""
@@ -130,10 +246,20 @@ def info():
         'endpoints': {
             'GET /health': 'Verificar saúde da API',
             'POST /predict': 'Classificar mensagem (body: {"text": "..."})',
+            'POST /predict-batch': 'Classificar várias mensagens (body: {"texts": ["...", "..."]})',
             'POST /predict-explain': 'Classificar com explicação detalhada',
+            'POST /predict-explain-batch': 'Classificar várias mensagens com as palavras mais influentes (body: {"texts": [...], "k": 10})',
             'POST /send': 'Enviar mensagem com verificação de spam',
             'GET /metrics': 'Obter métricas do modelo',
-            'POST /train': 'Treinar modelo (body: {"csv_path": "..."})',
-            'GET /info': 'Informações sobre a API'
+            'POST /train': 'Enfileirar treino do modelo (body: {"csv_path": "...", "backend": "svc|linear_svc|sgd"})',
+            'GET /train/<job_id>': 'Status de um job de treino',
+            'GET /info': 'Informações sobre a API',
+            'POST /feedback': 'Corrigir classificação (body: {"text": "...", "label": "spam|ham"})',
+            'GET /admin/model': 'Versão do modelo ativo',
+            'POST /admin/reload-model': 'Recarregar o modelo do disco (body opcional: {"force": true})',
+            'POST /admin/apply-feedback': 'Aplicar agora as correções pendentes',
+            'GET /admin/write-queue': 'Contadores da gravação em segundo plano do /send',
+            'GET /admin/predict-cache': 'Contadores do cache de predições',
+            'GET /admin/microbatch': 'Métricas dos micro-lotes de predição'
         }
     }), 200
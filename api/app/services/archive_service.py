@@ -0,0 +1,216 @@
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import text
+from app.models.email import db
+from app.utils.per_process import PerProcess
+
+# Retenção: emails mais antigos que EMAILS_RETENTION_DAYS saem da tabela
+# `emails` e vão para arquivos JSONL gzip, um por dia de recebimento
+# (EMAILS_ARCHIVE_DIR/AAAA-MM/emails-AAAA-MM-DD.jsonl.gz). A tabela
+# `emails_archived` (migração 5) guarda id -> dia para ler um email arquivado.
+_COLUMNS = ('id', 'sender', 'recipient', 'subject', 'body', 'received', 'is_spam', 'spam_score')
+_worker = PerProcess()
+
+# Páginas devolvidas por passo do VACUUM incremental
+VACUUM_STEP_PAGES = 1000
+
+def archive_path(archive_dir, day):
+    return os.path.join(archive_dir, day[:7], f'emails-{day}.jsonl.gz')
+
+def _to_json(row):
+    item = dict(zip(_COLUMNS, row))
+    item['received'] = datetime.fromisoformat(item['received']).isoformat()
+    item['is_spam'] = bool(item['is_spam'])
+    return json.dumps(item, ensure_ascii=False)
+
+def _append(path, lines):
+    # Cada chamada acrescenta um novo membro gzip ao arquivo (formato válido);
+    # fsync antes de apagar as linhas do banco
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='ab') as f:
+            f.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+def _archive_batch(cutoff, archive_dir, batch_size):
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        # BEGIN IMMEDIATE pega o lock de escrita antes da leitura: dois
+        # arquivadores (ex.: workers diferentes) nunca processam o mesmo lote
+        cursor.execute('BEGIN IMMEDIATE')
+        # A linha de maior id nunca sai: sem AUTOINCREMENT o SQLite reusaria
+        # ids arquivados se a tabela ficasse vazia
+        rows = cursor.execute(
+            f"SELECT {', '.join(_COLUMNS)}, date(received) FROM emails "
+            "WHERE received < ? AND id < (SELECT MAX(id) FROM emails) "
+            "ORDER BY received, id LIMIT ?",
+            (cutoff.strftime('%Y-%m-%d %H:%M:%S.%f'), batch_size)
+        ).fetchall()
+        if not rows:
+            conn.rollback()
+            return 0
+
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(row[-1], []).append(_to_json(row[:-1]))
+        for day, lines in by_day.items():
+            _append(archive_path(archive_dir, day), lines)
+
+        # Se algo falhar daqui em diante as linhas continuam no banco e são
+        # arquivadas de novo na próxima execução (a leitura usa a primeira cópia)
+        cursor.executemany(
+            'INSERT OR REPLACE INTO emails_archived (id, day) VALUES (?, ?)',
+            [(row[0], row[-1]) for row in rows]
+        )
+        cursor.executemany('DELETE FROM emails WHERE id = ?', [(row[0],) for row in rows])
+        conn.commit()
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def _auto_vacuum_mode(sqlite):
+    return sqlite.execute('PRAGMA auto_vacuum').fetchone()[0]
+
+def enable_incremental_vacuum():
+    """
+    Converte o banco para auto_vacuum=INCREMENTAL (bancos criados antes do
+    arquivamento). Faz um VACUUM completo, que reescreve o arquivo inteiro
+    segurando o lock de escrita: só para uso offline
+    (`archive_emails.py --vacuum-full`). Retorna False se já estava convertido.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        raise ValueError('VACUUM disponível apenas com SQLite')
+    conn = db.engine.raw_connection()
+    try:
+        sqlite = conn.driver_connection
+        if _auto_vacuum_mode(sqlite) == 2:
+            return False
+        sqlite.executescript('PRAGMA auto_vacuum = INCREMENTAL; VACUUM;')
+        return True
+    finally:
+        conn.close()
+
+def _incremental_vacuum():
+    """
+    Devolve ao sistema as páginas livres do arquivo do banco; retorna quantas.
+    Não faz nada se o banco não estiver em auto_vacuum=INCREMENTAL (ver
+    `enable_incremental_vacuum`): nunca reescreve o arquivo inteiro.
+    """
+    conn = db.engine.raw_connection()
+    try:
+        sqlite = conn.driver_connection
+        if _auto_vacuum_mode(sqlite) != 2:
+            return 0
+        freed = 0
+        free = sqlite.execute('PRAGMA freelist_count').fetchone()[0]
+        while free:
+            # Passos de VACUUM_STEP_PAGES páginas, cada um uma transação curta:
+            # escritas concorrentes (ex.: /send) entram entre eles. executescript
+            # roda o PRAGMA até o fim (execute() liberaria uma página só)
+            sqlite.executescript(f'PRAGMA incremental_vacuum({VACUUM_STEP_PAGES});')
+            remaining = sqlite.execute('PRAGMA freelist_count').fetchone()[0]
+            if remaining >= free:
+                break
+            freed += free - remaining
+            free = remaining
+        # Em WAL o arquivo só encolhe depois do checkpoint; PASSIVE não espera
+        # nem bloqueia leitores e escritores (o que não couber fica para o próximo)
+        sqlite.executescript('PRAGMA wal_checkpoint(PASSIVE);')
+        return freed
+    finally:
+        conn.close()
+
+def archive_emails(retention_days, archive_dir, batch_size=5000, now=None):
+    """
+    Move para o arquivo os emails recebidos há mais de `retention_days` dias,
+    em lotes de `batch_size` (uma transação por lote), e executa o VACUUM
+    incremental no final (só em bancos já em auto_vacuum=INCREMENTAL).
+    """
+    if db.engine.dialect.name != 'sqlite':
+        raise ValueError('Arquivamento disponível apenas com SQLite')
+    if retention_days <= 0:
+        raise ValueError('Retenção deve ser de pelo menos 1 dia')
+
+    cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+    archived = 0
+    batches = 0
+    while True:
+        count = _archive_batch(cutoff, archive_dir, batch_size)
+        if not count:
+            break
+        archived += count
+        batches += 1
+
+    return {
+        'archived': archived,
+        'batches': batches,
+        'cutoff': cutoff.isoformat(),
+        'freed_pages': _incremental_vacuum() if archived else 0
+    }
+
+def get_archived_email(email_id, archive_dir):
+    """Lê um email arquivado pelo id; None se ele nunca foi arquivado"""
+    if db.engine.dialect.name != 'sqlite':
+        return None
+    row = db.session.execute(
+        text('SELECT day FROM emails_archived WHERE id = :id'), {'id': email_id}
+    ).first()
+    if row is None:
+        return None
+
+    path = archive_path(archive_dir, row[0])
+    if not os.path.exists(path):
+        return None
+    # Toda linha começa com o id (ordem de _COLUMNS): só decodifica a certa
+    prefix = f'{{"id": {email_id},'
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith(prefix):
+                item = json.loads(line)
+                item['archived'] = True
+                return item
+    return None
+
+class _ArchiveWorker(threading.Thread):
+    """Executa o arquivamento periodicamente em segundo plano"""
+
+    def __init__(self, app, interval):
+        super().__init__(name='email-archiver', daemon=True)
+        self.app = app
+        self.interval = interval
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    config = self.app.config
+                    result = archive_emails(
+                        config['EMAILS_RETENTION_DAYS'], config['EMAILS_ARCHIVE_DIR'],
+                        config['EMAILS_ARCHIVE_BATCH_SIZE']
+                    )
+                if result['archived']:
+                    self.app.logger.info('Emails arquivados: %s', result)
+            except Exception as e:
+                self.app.logger.error('Erro ao arquivar emails: %s', e)
+
+def _start_worker():
+    interval = current_app.config['EMAILS_ARCHIVE_INTERVAL']
+    if interval <= 0 or current_app.config['EMAILS_RETENTION_DAYS'] <= 0:
+        return None
+    worker = _ArchiveWorker(current_app._get_current_object(), interval)
+    worker.start()
+    return worker
+
+def ensure_worker():
+    _worker.get(_start_worker)
@@ -1,5 +1,10 @@
+import base64
+import json
 from datetime import datetime
-from app.models.email import db, EmailRecord
+from sqlalchemy import insert, text, tuple_
+from sqlalchemy.orm import load_only
+from app.models.email import db, EmailRecord, SUMMARY_COLUMNS
+from app.models.migrations import SCORE_BUCKETS
 
 def create_email(sender, recipient, subject, body, is_spam, spam_score, received=None):
     if received is None:
@@ -18,5 +23,271 @@ def create_email(sender, recipient, subject, body, is_spam, spam_score, received
     db.session.commit()
     return email
 
-def get_all_emails():
-    return EmailRecord.query.order_by(EmailRecord.received.desc()).all()
+async def create_email_async(engine, sender, recipient, subject, body, is_spam, spam_score, received=None):
+    """create_email para o modo ASGI: grava por um AsyncEngine (aiosqlite) sem bloquear o event loop"""
+    async with engine.begin() as conn:
+        await conn.execute(insert(EmailRecord.__table__), [{
+            'sender': sender,
+            'recipient': recipient,
+            'subject': subject,
+            'body': body,
+            'received': received or datetime.now(),
+            'is_spam': is_spam,
+            'spam_score': spam_score
+        }])
+
+def classification_text(subject, body):
+    return f"{subject or ''}\n{body or ''}".strip()
+
+def fill_scores(mappings, classify=None):
+    """
+    Preenche is_spam/spam_score dos registros que chegaram sem pontuação.
+
+    Com `classify` (ex.: `spam_service.predict_batch`), todos os textos
+    pendentes são classificados em uma única chamada; sem ele recebem os
+    valores padrão (não spam, 0.0).
+    """
+    pending = [m for m in mappings if m['is_spam'] is None or m['spam_score'] is None]
+    if not pending:
+        return
+
+    if classify is None:
+        for m in pending:
+            m['is_spam'] = bool(m['is_spam'])
+            m['spam_score'] = m['spam_score'] or 0.0
+        return
+
+    results = classify([classification_text(m['subject'], m['body']) for m in pending])
+    for m, result in zip(pending, results):
+        m['is_spam'] = result['label'] == 'spam'
+        m['spam_score'] = result['confidence']
+
+def bulk_create_emails(records, chunk_size=1000, classify=None):
+    """
+    Insere registros em lotes: um executemany e um commit por lote.
+
+    `records` é um iterável de `(índice, mapping)` onde `mapping` é um dict com
+    as colunas de `EmailRecord` ou uma exceção (registro inválido). Erros são
+    reportados por índice sem abortar o restante. Registros sem pontuação
+    são classificados por lote com `classify` (ver `fill_scores`), que
+    vetoriza e pontua o lote inteiro de uma vez. Se um lote falhar no banco,
+    suas linhas são reinseridas uma a uma para isolar as problemáticas.
+    Retorna `(inseridos, erros)`.
+    """
+    inserted = 0
+    errors = []
+    chunk = []
+
+    def flush():
+        nonlocal inserted
+        if not chunk:
+            return
+        fill_scores([m for _, m in chunk], classify)
+        try:
+            db.session.execute(insert(EmailRecord), [m for _, m in chunk])
+            db.session.commit()
+            inserted += len(chunk)
+        except Exception:
+            db.session.rollback()
+            for index, mapping in chunk:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(insert(EmailRecord), [mapping])
+                    inserted += 1
+                except Exception as e:
+                    errors.append({'index': index, 'error': str(getattr(e, 'orig', None) or e)})
+            db.session.commit()
+        chunk.clear()
+
+    for index, mapping in records:
+        if isinstance(mapping, Exception):
+            errors.append({'index': index, 'error': str(mapping)})
+            continue
+        chunk.append((index, mapping))
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+
+    return inserted, errors
+
+def get_email(email_id):
+    return db.session.get(EmailRecord, email_id)
+
+def encode_cursor(record):
+    """Cursor opaco com a posição (received, id) do último item da página"""
+    raw = json.dumps([record.received.isoformat(), record.id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        received, email_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(received), int(email_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+def list_emails(limit, cursor=None, is_spam=None, recipient=None, since=None):
+    """
+    Página de emails mais recentes primeiro, por cursor (keyset) em (received, id).
+
+    Cada página é uma busca por faixa no índice, então custa o mesmo
+    independentemente da profundidade. Retorna `(registros, próximo_cursor)`.
+    """
+    query = EmailRecord.query.options(load_only(*SUMMARY_COLUMNS))
+    if is_spam is not None:
+        query = query.filter(EmailRecord.is_spam == is_spam)
+    if recipient is not None:
+        query = query.filter(EmailRecord.recipient == recipient)
+    if since is not None:
+        query = query.filter(EmailRecord.received >= since)
+    if cursor is not None:
+        received, email_id = decode_cursor(cursor)
+        query = query.filter(tuple_(EmailRecord.received, EmailRecord.id) < (received, email_id))
+
+    records = query.order_by(EmailRecord.received.desc(), EmailRecord.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor(records[-1])
+    return records, next_cursor
+
+def change_version():
+    """
+    Versão atual de emails: contador incrementado por triggers a cada
+    alteração (ver migração 3). None fora do SQLite.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return None
+    row = db.session.execute(text('SELECT version FROM emails_changes WHERE id = 1')).first()
+    return row[0] if row else None
+
+def max_email_id():
+    return db.session.execute(db.select(db.func.max(EmailRecord.id))).scalar() or 0
+
+def list_emails_since(since_id, limit, is_spam=None, recipient=None):
+    """
+    Sincronização incremental: emails com id maior que `since_id`, em ordem
+    de inserção. Usa o id (e não `received`) porque um email gravado depois
+    pode ter data de recebimento antiga. Retorna `(registros, há_mais)`.
+    """
+    query = EmailRecord.query.options(load_only(*SUMMARY_COLUMNS)).filter(EmailRecord.id > since_id)
+    if is_spam is not None:
+        query = query.filter(EmailRecord.is_spam == is_spam)
+    if recipient is not None:
+        query = query.filter(EmailRecord.recipient == recipient)
+
+    records = query.order_by(EmailRecord.id).limit(limit + 1).all()
+    return records[:limit], len(records) > limit
+
+def _sqlite_table_exists(name):
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).first() is not None
+
+def fts_available():
+    return _sqlite_table_exists('emails_fts')
+
+def stats_available():
+    return _sqlite_table_exists('emails_daily_stats')
+
+def get_stats(since=None, until=None):
+    """
+    Estatísticas da caixa a partir das tabelas agregadas (migração 4), que os
+    triggers mantêm a cada inserção: o custo depende do número de dias e
+    faixas, não do número de emails. `since`/`until` (datas) limitam só o
+    histograma diário; os totais e a distribuição cobrem tudo, inclusive os
+    emails já arquivados (migração 7).
+    """
+    daily_sql = 'SELECT day, total, spam, score_sum FROM emails_daily_stats'
+    conditions, params = [], {}
+    if since is not None:
+        conditions.append('day >= :since')
+        params['since'] = since.isoformat()
+    if until is not None:
+        conditions.append('day <= :until')
+        params['until'] = until.isoformat()
+    if conditions:
+        daily_sql += ' WHERE ' + ' AND '.join(conditions)
+    daily_rows = db.session.execute(text(daily_sql + ' ORDER BY day'), params).all()
+
+    total, spam, score_sum = db.session.execute(text(
+        'SELECT COALESCE(SUM(total), 0), COALESCE(SUM(spam), 0), COALESCE(SUM(score_sum), 0) '
+        'FROM emails_daily_stats'
+    )).one()
+    buckets = dict(
+        (bucket, (count, bucket_spam)) for bucket, count, bucket_spam in
+        db.session.execute(text('SELECT bucket, total, spam FROM emails_score_stats'))
+    )
+
+    return {
+        'total': total,
+        'spam': spam,
+        'ham': total - spam,
+        'spam_ratio': spam / total if total else 0.0,
+        'avg_spam_score': score_sum / total if total else 0.0,
+        'daily': [
+            {'day': day, 'total': count, 'spam': day_spam, 'ham': count - day_spam,
+             'avg_spam_score': day_score / count if count else 0.0}
+            for day, count, day_spam, day_score in daily_rows
+        ],
+        'score_distribution': [
+            {
+                'min': i / SCORE_BUCKETS,
+                'max': (i + 1) / SCORE_BUCKETS,
+                'total': buckets.get(i, (0, 0))[0],
+                'spam': buckets.get(i, (0, 0))[1]
+            }
+            for i in range(SCORE_BUCKETS)
+        ]
+    }
+
+def _fts_query(q):
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada termo vira
+    uma frase entre aspas (AND implícito); `termo*` vira busca por prefixo.
+    """
+    terms = []
+    for term in q.split():
+        prefix = term.endswith('*')
+        term = term.rstrip('*')
+        if not term:
+            continue
+        terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    if not terms:
+        raise ValueError('Consulta de busca vazia')
+    return ' '.join(terms)
+
+def search_emails(q, limit, offset=0, is_spam=None):
+    """
+    Busca textual em subject/body pelo índice FTS5, ordenada por relevância (bm25).
+
+    Retorna `(lista de (registro, rank, snippet), próximo_offset ou None)`.
+    """
+    sql = (
+        "SELECT emails_fts.rowid, emails_fts.rank, "
+        "snippet(emails_fts, -1, '<mark>', '</mark>', '…', 16) "
+        "FROM emails_fts "
+    )
+    params = {'q': _fts_query(q), 'limit': limit + 1, 'offset': offset}
+    if is_spam is not None:
+        sql += "JOIN emails ON emails.id = emails_fts.rowid WHERE emails_fts MATCH :q AND emails.is_spam = :is_spam "
+        params['is_spam'] = is_spam
+    else:
+        sql += "WHERE emails_fts MATCH :q "
+    # A coluna oculta `rank` do FTS5 é o bm25, com o caminho otimizado de ORDER BY
+    sql += "ORDER BY emails_fts.rank LIMIT :limit OFFSET :offset"
+
+    rows = db.session.execute(text(sql), params).all()
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
+
+    ids = [row[0] for row in rows]
+    records = {r.id: r for r in EmailRecord.query.options(load_only(*SUMMARY_COLUMNS)).filter(EmailRecord.id.in_(ids))}
+    results = [(records[row[0]], row[1], row[2]) for row in rows if row[0] in records]
+    return results, next_offset
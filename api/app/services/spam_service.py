@@ -1,35 +1,372 @@
+import asyncio
+import json
+import logging
+import threading
+import time
 from flask import current_app
 from app.utils.spam_detector import SpamDetector
+from app.utils.prediction_cache import PredictionCache
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.model_artifact import publish_lock
+from app.utils.per_process import PerProcess
 
+logger = logging.getLogger(__name__)
+
+# O detector ativo é sempre trocado por inteiro (atribuição de referência),
+# nunca modificado no lugar: cada requisição pega uma referência e usa um
+# modelo completo do início ao fim, mesmo que um reload aconteça no meio.
 _detector = None
+_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_paths = None
+_watcher = PerProcess()
 
-def get_detector():
-    global _detector
+# Correções recebidas em POST /feedback aguardando a próxima atualização incremental
+_feedback = []
+_feedback_since = None
+_feedback_lock = threading.Lock()
+_feedback_apply_lock = threading.Lock()
+_feedback_settings = {}
+
+# Resultados recentes de predict/predict_batch por texto normalizado; é
+# esvaziado a cada troca de detector (None = cache desativado)
+_cache = None
+
+# Agrupador das chamadas concorrentes de predict (um por processo)
+_batcher = PerProcess()
+_batcher_settings = (0, 1)
+
+def _new_detector():
+    model_path, vectorizer_path, backend = _paths
+    return SpamDetector(model_path=model_path, vectorizer_path=vectorizer_path, backend=backend)
+
+def _load_detector():
+    global _detector, _paths, _cache, _batcher_settings
     if _detector is None:
-        _detector = SpamDetector(
-            model_path=current_app.config['MODEL_PATH'],
-            vectorizer_path=current_app.config['VECTORIZER_PATH']
-        )
+        with _lock:
+            if _detector is None:
+                _paths = (current_app.config['MODEL_PATH'], current_app.config['VECTORIZER_PATH'],
+                          current_app.config['TRAIN_BACKEND'])
+                _batcher_settings = (current_app.config['MICROBATCH_WINDOW'],
+                                     current_app.config['MICROBATCH_MAX_SIZE'])
+                if current_app.config['PREDICT_CACHE_SIZE'] > 0:
+                    _cache = PredictionCache(current_app.config['PREDICT_CACHE_SIZE'],
+                                             current_app.config['PREDICT_CACHE_TTL'])
+                _feedback_settings.update({
+                    key: current_app.config[key] for key in (
+                        'FEEDBACK_BATCH_SIZE', 'FEEDBACK_FLUSH_INTERVAL',
+                        'FEEDBACK_LEARNING_RATE', 'FEEDBACK_ALPHA', 'FEEDBACK_LOG_PATH'
+                    )
+                })
+                _detector = _new_detector()
+
+def get_detector():
+    _load_detector()
+    _ensure_watcher()
+    return _detector
+
+def preload():
+    """
+    Carrega o modelo sem iniciar threads. Usado no processo mestre do
+    gunicorn antes do fork (ver wsgi.py): os workers herdam o detector já
+    carregado e criam suas próprias threads no primeiro uso.
+    """
+    _load_detector()
     return _detector
 
+def _swap(detector):
+    global _detector
+    with _lock:
+        _detector = detector
+    if _cache is not None:
+        _cache.clear()
+
+def reload_model(force=False):
+    """
+    Carrega o modelo do disco em um novo detector e o troca atomicamente.
+
+    Sem `force`, só recarrega se a versão em disco for diferente da ativa.
+    """
+    current = get_detector()
+    with _reload_lock:
+        previous_version = _detector.version
+        disk_version = current.disk_version()
+        if disk_version is None:
+            return {'reloaded': False, 'version': previous_version, 'reason': 'Nenhum modelo salvo encontrado'}
+        if not force and disk_version == previous_version:
+            return {'reloaded': False, 'version': previous_version}
+
+        detector = _new_detector()
+        if not detector.is_loaded():
+            return {'reloaded': False, 'version': previous_version, 'reason': 'Falha ao carregar o modelo'}
+
+        _swap(detector)
+        return {'reloaded': True, 'version': detector.version, 'previous_version': previous_version}
+
+def get_model_status():
+    det = get_detector()
+    watcher = _watcher.current()
+    return {
+        'version': det.version,
+        'disk_version': det.disk_version(),
+        'model_path': det.model_path,
+        'loaded': det.is_loaded(),
+        'watcher_interval': watcher.interval if watcher else 0
+    }
+
+class _ModelWatcher(threading.Thread):
+    """Verifica periodicamente a versão em disco e recarrega em segundo plano"""
+
+    def __init__(self, interval):
+        super().__init__(name='model-watcher', daemon=True)
+        self.interval = interval
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                reload_model()
+            except Exception as e:
+                logger.error('Erro ao recarregar modelo: %s', e)
+
+def _start_watcher():
+    interval = current_app.config.get('MODEL_RELOAD_INTERVAL', 0)
+    if not interval or interval <= 0:
+        return None
+    watcher = _ModelWatcher(interval)
+    watcher.start()
+    return watcher
+
+def _ensure_watcher():
+    _watcher.get(_start_watcher)
+
+def add_feedback(items):
+    """
+    Registra correções [(texto, rótulo)] e agenda a atualização incremental
+    quando o buffer atinge FEEDBACK_BATCH_SIZE ou, para um buffer parcial,
+    FEEDBACK_FLUSH_INTERVAL segundos depois da primeira correção.
+    """
+    global _feedback_since
+    det = get_detector()
+    labels = set(map(str, det.classes_)) if det.classes_ is not None else set()
+    for text, label in items:
+        if label not in labels:
+            raise ValueError(f"Rótulo inválido: {label}")
+
+    # Log em disco para não perder correções e para usá-las no próximo treino completo
+    log_path = _feedback_settings.get('FEEDBACK_LOG_PATH')
+    if log_path:
+        with open(log_path, 'a', encoding='utf-8') as f:
+            for text, label in items:
+                f.write(json.dumps({'text': text, 'label': label}, ensure_ascii=False) + '\n')
+
+    with _feedback_lock:
+        if not _feedback:
+            _feedback_since = time.time()
+            _schedule_flush(_feedback_since)
+        _feedback.extend(items)
+        pending = len(_feedback)
+
+    if pending >= _feedback_settings['FEEDBACK_BATCH_SIZE']:
+        threading.Thread(target=_apply_feedback_logged, name='feedback-apply', daemon=True).start()
+        pending = 0
+    return pending
+
+def _schedule_flush(since):
+    # Timer próprio: o buffer parcial é aplicado mesmo sem o watcher (MODEL_RELOAD_INTERVAL=0)
+    timer = threading.Timer(_feedback_settings['FEEDBACK_FLUSH_INTERVAL'], _flush_by_age, args=(since,))
+    timer.name = 'feedback-flush'
+    timer.daemon = True
+    timer.start()
+
+def _flush_by_age(since):
+    """Aplica o buffer iniciado em `since`, se ainda for o mesmo; senão tenta de novo depois"""
+    with _feedback_lock:
+        if not _feedback or _feedback_since != since:
+            return
+    _apply_feedback_logged()
+    with _feedback_lock:
+        # Falhou ou outra atualização estava em andamento: as correções continuam no buffer
+        if _feedback and _feedback_since == since:
+            _schedule_flush(since)
+
+def _apply_feedback_logged():
+    try:
+        # Correções que chegaram durante a atualização ficaram no buffer: repetir enquanto ele estiver cheio
+        while apply_feedback()['applied']:
+            with _feedback_lock:
+                if len(_feedback) < _feedback_settings['FEEDBACK_BATCH_SIZE']:
+                    break
+    except Exception as e:
+        logger.error('Erro ao aplicar feedback: %s', e)
+
+def apply_feedback():
+    """
+    Aplica o buffer de correções ao modelo ativo, publica o artefato no mesmo
+    caminho que o SpamDetector carrega e troca o detector atomicamente.
+    """
+    # Só uma atualização por vez; quem chegar depois espera a próxima rodada
+    if not _feedback_apply_lock.acquire(blocking=False):
+        return {'applied': 0, 'version': get_detector().version}
+    try:
+        with _feedback_lock:
+            items = list(_feedback)
+            _feedback.clear()
+        if not items:
+            return {'applied': 0, 'version': get_detector().version}
+
+        texts, labels = zip(*items)
+        try:
+            # Lock entre processos: outro worker ou um job de treino pode publicar
+            # no mesmo MODEL_PATH. Dentro dele, partir da versão mais recente em disco
+            with publish_lock(_paths[0]):
+                reload_model()
+                base = get_detector()
+                detector = base.with_feedback(
+                    texts, labels,
+                    learning_rate=_feedback_settings['FEEDBACK_LEARNING_RATE'],
+                    alpha=_feedback_settings['FEEDBACK_ALPHA']
+                )
+                if base.disk_version() != base.version:
+                    raise RuntimeError('O modelo em disco mudou durante a atualização; feedback mantido no buffer')
+                detector.save_model()
+        except Exception:
+            # Devolver as correções ao buffer para a próxima tentativa
+            with _feedback_lock:
+                _feedback[:0] = items
+            raise
+
+        _swap(detector)
+        return {'applied': len(items), 'version': detector.version}
+    finally:
+        _feedback_apply_lock.release()
+
+def get_feedback_status():
+    with _feedback_lock:
+        return {
+            'pending': len(_feedback),
+            'batch_size': _feedback_settings.get('FEEDBACK_BATCH_SIZE'),
+            'flush_interval': _feedback_settings.get('FEEDBACK_FLUSH_INTERVAL')
+        }
+
+def _score_items(items):
+    """Pontua itens (detector, texto) com uma chamada de predict_batch por detector"""
+    results = [None] * len(items)
+    groups = {}
+    for i, (det, text) in enumerate(items):
+        groups.setdefault(id(det), (det, []))[1].append(i)
+    for det, indexes in groups.values():
+        for i, result in zip(indexes, det.predict_batch([items[i][1] for i in indexes])):
+            results[i] = result
+    return results
+
+def _new_batcher():
+    window, max_size = _batcher_settings
+    if window <= 0:
+        return None
+    return MicroBatcher(_score_items, max_size=max_size, window=window)
+
+def _get_batcher():
+    return _batcher.get(_new_batcher)
+
+def _predict_one(det, text):
+    # O detector vai junto com o texto: o lote usa o mesmo modelo que a
+    # requisição viu, mesmo que haja um reload durante a janela
+    batcher = _get_batcher()
+    if batcher is None or not det.is_loaded():
+        return det.predict(text)
+    return batcher.submit((det, text))
+
+def get_batcher_stats():
+    get_detector()
+    batcher = _get_batcher()
+    return batcher.get_stats() if batcher is not None else None
+
+def _cache_key(det, text):
+    # id(det) separa detectores ainda sem versão (ex.: recém-treinados em memória)
+    return (det.version, id(det), PredictionCache.digest(det.normalize_text(text)))
+
 def predict(text):
-    return get_detector().predict(text)
+    det = get_detector()
+    if _cache is None or not det.is_loaded():
+        return _predict_one(det, text)
 
-def predict_with_explanation(text):
-    return get_detector().predict_with_explanation(text)
+    key = _cache_key(det, text)
+    cached = _cache.get(key)
+    if cached is not None:
+        label, confidence = cached
+        return {'text': text, 'label': label, 'confidence': confidence}
+
+    result = _predict_one(det, text)
+    _cache.put(key, (result['label'], result['confidence']))
+    return result
+
+async def predict_async(text, executor=None):
+    """
+    `predict` para o modo ASGI (app/asgi.py): acertos de cache respondem na
+    hora; os demais esperam o micro-lote sem ocupar thread ou, sem
+    agrupador, rodam em `executor`. O event loop nunca pontua.
+    """
+    det = get_detector()
+    key = None
+    if _cache is not None and det.is_loaded():
+        key = _cache_key(det, text)
+        cached = _cache.get(key)
+        if cached is not None:
+            label, confidence = cached
+            return {'text': text, 'label': label, 'confidence': confidence}
+
+    batcher = _get_batcher()
+    if batcher is None or not det.is_loaded():
+        result = await asyncio.get_running_loop().run_in_executor(executor, det.predict, text)
+    else:
+        result = await batcher.submit_async((det, text), executor)
+    if key is not None:
+        _cache.put(key, (result['label'], result['confidence']))
+    return result
+
+def predict_batch(texts):
+    det = get_detector()
+    if _cache is None or not det.is_loaded():
+        return det.predict_batch(texts)
+
+    texts = list(texts)
+    keys = [_cache_key(det, text) for text in texts]
+    scores = {}
+    missing = {}
+    for text, key in zip(texts, keys):
+        if key in scores or key in missing:
+            continue
+        cached = _cache.get(key)
+        if cached is not None:
+            scores[key] = cached
+        else:
+            missing[key] = text
 
-def load_data(csv_path):
-    return get_detector().load_data(csv_path)
+    # Só os textos inéditos (e cada um uma vez só) passam pelo modelo
+    if missing:
+        results = det.predict_batch(list(missing.values()))
+        for key, result in zip(missing, results):
+            scores[key] = (result['label'], result['confidence'])
+            _cache.put(key, scores[key])
 
-def train(X, y):
-    return get_detector().train(X, y)
+    return [
+        {'text': text, 'label': scores[key][0], 'confidence': scores[key][1]}
+        for text, key in zip(texts, keys)
+    ]
 
-def save_model():
-    get_detector().save_model()
+def get_cache_stats():
+    get_detector()
+    return _cache.get_stats() if _cache is not None else None
+
+def predict_with_explanation(text):
+    return get_detector().predict_with_explanation(text)
+
+def predict_with_explanation_batch(texts, k=10):
+    return get_detector().predict_with_explanation_batch(texts, k=k)
 
 def get_metrics():
     return get_detector().get_metrics()
 
 def is_model_loaded():
-    det = get_detector()
-    return det.model is not None and det.vectorizer is not None
+    return get_detector().is_loaded()
@@ -0,0 +1,159 @@
+import functools
+import json
+import multiprocessing
+import os
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from app.utils.per_process import PerProcess
+
+# O estado de cada job fica em um arquivo JSON em TRAIN_JOBS_DIR, escrito pelo
+# processo de treino. Assim qualquer worker do servidor consegue responder
+# GET /train/<job_id>, não só o que recebeu o POST.
+_executor = PerProcess()
+
+def _job_file(jobs_dir, job_id):
+    return os.path.join(jobs_dir, f'{job_id}.json')
+
+def _write_status(jobs_dir, job_id, **fields):
+    path = _job_file(jobs_dir, job_id)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        status = {'job_id': job_id}
+
+    status.update(fields)
+    status['updated'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return status
+
+def _run_job(jobs_dir, job_id, csv_path, model_path, vectorizer_path, backend):
+    """Executa o treino em um processo separado, atualizando o arquivo de status"""
+    from app.utils.spam_detector import SpamDetector
+    from app.utils.model_artifact import publish_lock
+
+    started = time.time()
+    try:
+        _write_status(jobs_dir, job_id, status='running', stage='loading_data', progress=0.1)
+        detector = SpamDetector(model_path=model_path, vectorizer_path=vectorizer_path, autoload=False,
+                                backend=backend)
+        X, y = detector.load_data(csv_path)
+
+        _write_status(jobs_dir, job_id, stage='training', progress=0.3, n_samples=int(len(X)))
+        detector.train(X, y)
+
+        _write_status(jobs_dir, job_id, stage='saving', progress=0.9)
+        # Não sobrescrever no meio uma publicação do feedback incremental (outro processo)
+        with publish_lock(model_path):
+            detector.save_model()
+
+        metrics = detector.get_metrics()
+        _write_status(
+            jobs_dir, job_id,
+            status='finished',
+            stage='done',
+            progress=1.0,
+            duration=round(time.time() - started, 3),
+            metrics={
+                'accuracy': metrics['accuracy'],
+                'precision': metrics['precision'],
+                'recall': metrics['recall'],
+                'f1_score': metrics['f1']
+            },
+            artifact={
+                'model_path': model_path,
+                'vectorizer_path': None if detector.uses_artifact() else vectorizer_path,
+                'version': detector.version
+            }
+        )
+    except Exception as e:
+        _write_status(
+            jobs_dir, job_id,
+            status='failed',
+            duration=round(time.time() - started, 3),
+            error=str(e),
+            traceback=traceback.format_exc()
+        )
+
+def _job_done(jobs_dir, job_id, executor, future):
+    """
+    Callback do Future de cada job. `_run_job` grava os próprios erros; se o
+    Future falhou, o processo de treino morreu antes disso (ex.: OOM killer)
+    e o job ficaria 'running' para sempre. Um pool quebrado não aceita mais
+    jobs, então é descartado e o próximo submit cria outro.
+    """
+    if future.cancelled():
+        error = 'Job cancelado antes de iniciar'
+    else:
+        exc = future.exception()
+        if exc is None:
+            return
+        if isinstance(exc, BrokenProcessPool):
+            _executor.discard(executor)
+            error = f'Processo de treino encerrado inesperadamente: {exc}'
+        else:
+            error = str(exc)
+    status = _read_status(jobs_dir, job_id)
+    if status and status.get('status') == 'finished':
+        return
+    _write_status(jobs_dir, job_id, status='failed', error=error)
+
+def _new_executor():
+    # 'spawn' evita herdar threads, locks e conexões de banco do servidor
+    return ProcessPoolExecutor(
+        max_workers=current_app.config['TRAIN_MAX_WORKERS'],
+        mp_context=multiprocessing.get_context('spawn')
+    )
+
+def _get_executor():
+    return _executor.get(_new_executor)
+
+def submit(csv_path, backend=None):
+    """Enfileira um job de treino e retorna seu status inicial"""
+    jobs_dir = current_app.config['TRAIN_JOBS_DIR']
+    os.makedirs(jobs_dir, exist_ok=True)
+    backend = backend or current_app.config['TRAIN_BACKEND']
+
+    job_id = uuid.uuid4().hex
+    status = _write_status(
+        jobs_dir, job_id,
+        status='queued',
+        stage='queued',
+        progress=0.0,
+        csv_path=csv_path,
+        backend=backend,
+        created=time.strftime('%Y-%m-%dT%H:%M:%S')
+    )
+    args = (_run_job, jobs_dir, job_id, csv_path,
+            current_app.config['MODEL_PATH'], current_app.config['VECTORIZER_PATH'], backend)
+    executor = _get_executor()
+    try:
+        future = executor.submit(*args)
+    except BrokenProcessPool:
+        # O pool quebrou e o callback ainda não o descartou
+        _executor.discard(executor)
+        executor = _get_executor()
+        future = executor.submit(*args)
+    future.add_done_callback(functools.partial(_job_done, jobs_dir, job_id, executor))
+    return status
+
+def _read_status(jobs_dir, job_id):
+    try:
+        with open(_job_file(jobs_dir, job_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def get_job(job_id):
+    """Status de um job, ou None se não existir"""
+    if not job_id.isalnum():
+        return None
+    return _read_status(current_app.config['TRAIN_JOBS_DIR'], job_id)
@@ -0,0 +1,123 @@
+import atexit
+import queue
+import threading
+import time
+from flask import current_app
+from app.services import email_service
+from app.utils.per_process import PerProcess
+
+# Fila de gravação em segundo plano (write-behind) do POST /send: a requisição
+# só enfileira o registro e uma thread grava em grupos (por tamanho ou janela
+# de tempo), uma transação por grupo. A fila é por processo.
+_queue = PerProcess()
+
+class WriteBehindQueue:
+    def __init__(self, app, max_size, batch_size, flush_interval):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._items = queue.Queue(maxsize=max_size)
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'failed': 0,
+            'batches': 0
+        }
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def put(self, mapping):
+        """Enfileira um registro; retorna False (e conta como descartado) se a fila estiver cheia"""
+        try:
+            self._items.put_nowait(mapping)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('enqueued')
+        return True
+
+    def _run(self):
+        while not (self._stop.is_set() and self._items.empty()):
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def _collect(self):
+        """Junta até batch_size registros ou o que chegar dentro de flush_interval"""
+        try:
+            batch = [self._items.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._items.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            with self.app.app_context():
+                inserted, errors = email_service.bulk_create_emails(
+                    enumerate(batch), chunk_size=len(batch)
+                )
+            self._count('written', inserted)
+            self._count('failed', len(errors))
+            for error in errors:
+                self.app.logger.error('Falha ao gravar email enviado: %s', error['error'])
+        except Exception as e:
+            self._count('failed', len(batch))
+            self.app.logger.error('Falha ao gravar lote de emails enviados: %s', e)
+        self._count('batches')
+
+    def flush(self, timeout=10.0):
+        """Para a thread depois de gravar tudo o que está na fila"""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['queued'] = self._items.qsize()
+        stats['max_size'] = self._items.maxsize
+        stats['batch_size'] = self.batch_size
+        stats['flush_interval'] = self.flush_interval
+        return stats
+
+def _new_queue():
+    return WriteBehindQueue(
+        current_app._get_current_object(),
+        max_size=current_app.config['WRITE_QUEUE_MAX_SIZE'],
+        batch_size=current_app.config['WRITE_QUEUE_BATCH_SIZE'],
+        flush_interval=current_app.config['WRITE_QUEUE_FLUSH_INTERVAL']
+    )
+
+def get_queue():
+    return _queue.get(_new_queue)
+
+def enqueue(mapping):
+    return get_queue().put(mapping)
+
+def flush():
+    queue = _queue.current()
+    if queue is not None:
+        queue.flush()
+
+def get_stats():
+    queue = _queue.current()
+    if queue is None:
+        return None
+    return queue.get_stats()
+
+atexit.register(flush)
@@ -0,0 +1,184 @@
+import asyncio
+import queue
+import threading
+import time
+
+# Limites superiores das faixas do histograma de tamanho de lote
+_HISTOGRAM_BOUNDS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class _Pending:
+    __slots__ = ('item', 'enqueued', 'done', 'result', 'error', 'loop', 'future')
+
+    def __init__(self, item, loop=None):
+        self.item = item
+        self.enqueued = time.monotonic()
+        self.result = None
+        self.error = None
+        # Com `loop`, quem espera é uma corrotina (future do event loop) e não uma thread
+        self.loop = loop
+        self.done = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def finish(self):
+        if self.loop is None:
+            self.done.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if self.future.cancelled():
+            return
+        if self.error is not None:
+            self.future.set_exception(self.error)
+        else:
+            self.future.set_result(self.result)
+
+
+class MicroBatcher:
+    """
+    Junta chamadas concorrentes em lotes para uma única chamada vetorizada.
+
+    `fn` recebe uma lista de itens e devolve a lista de resultados na mesma
+    ordem. Cada `submit` bloqueia até o resultado do seu item sair
+    (`submit_async` é a versão para corrotinas, que não ocupa thread). Uma
+    thread junta os itens que chegarem dentro de `window` segundos após o
+    primeiro (ou até `max_size`, ou até todas as chamadas em andamento estarem
+    no lote) e chama `fn` uma vez para todos. Sem outras chamadas em
+    andamento, `submit` chama `fn` direto, sem esperar a janela.
+    """
+
+    def __init__(self, fn, max_size, window):
+        self.fn = fn
+        self.max_size = max_size
+        self.window = window
+        self._items = queue.Queue()
+        self._active = 0
+        self._active_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'bypassed': 0,
+            'batched': 0,
+            'batches': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0
+        }
+        self._histogram = [0] * (len(_HISTOGRAM_BOUNDS) + 1)
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        with self._active_lock:
+            idle = self._active == 0
+            self._active += 1
+        try:
+            if idle:
+                with self._stats_lock:
+                    self.stats['requests'] += 1
+                    self.stats['bypassed'] += 1
+                return self.fn([item])[0]
+
+            pending = _Pending(item)
+            self._items.put(pending)
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+        finally:
+            with self._active_lock:
+                self._active -= 1
+
+    async def submit_async(self, item, executor=None):
+        """
+        Como `submit`, mas aguardado no event loop: enquanto o lote não sai
+        nenhuma thread fica parada esperando. A chamada direta (sem outras em
+        andamento) roda em `executor` para não bloquear o loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._active_lock:
+            idle = self._active == 0
+            self._active += 1
+        try:
+            if idle:
+                with self._stats_lock:
+                    self.stats['requests'] += 1
+                    self.stats['bypassed'] += 1
+                return (await loop.run_in_executor(executor, self.fn, [item]))[0]
+
+            pending = _Pending(item, loop)
+            self._items.put(pending)
+            return await pending.future
+        finally:
+            with self._active_lock:
+                self._active -= 1
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            try:
+                for pending, result in zip(batch, self.fn([p.item for p in batch])):
+                    pending.result = result
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            for pending in batch:
+                pending.finish()
+            self._record(batch, started)
+
+    def _collect(self):
+        """Espera o primeiro item e junta os que chegarem até o fim da janela"""
+        batch = [self._items.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_size:
+            # Todas as chamadas em andamento já estão no lote: esperar não junta mais nada
+            if len(batch) >= self._active:
+                break
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._items.get(timeout=remaining))
+                else:
+                    batch.append(self._items.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _record(self, batch, started):
+        waits = [started - p.enqueued for p in batch]
+        bucket = next((i for i, bound in enumerate(_HISTOGRAM_BOUNDS) if len(batch) <= bound),
+                      len(_HISTOGRAM_BOUNDS))
+        with self._stats_lock:
+            self.stats['requests'] += len(batch)
+            self.stats['batched'] += len(batch)
+            self.stats['batches'] += 1
+            self.stats['wait_total'] += sum(waits)
+            self.stats['wait_max'] = max(self.stats['wait_max'], max(waits))
+            self._histogram[bucket] += 1
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+            histogram = list(self._histogram)
+        labels = []
+        low = 1
+        for bound in _HISTOGRAM_BOUNDS:
+            labels.append(str(bound) if low == bound else f'{low}-{bound}')
+            low = bound + 1
+        labels.append(f'{low}+')
+
+        batched = stats.pop('batched')
+        wait_total = stats.pop('wait_total')
+        stats['batched'] = batched
+        stats['queue_depth'] = self._items.qsize()
+        stats['in_flight'] = self._active
+        stats['avg_batch_size'] = batched / stats['batches'] if stats['batches'] else 0.0
+        stats['batch_size_histogram'] = [
+            {'size': label, 'batches': count} for label, count in zip(labels, histogram)
+        ]
+        stats['avg_wait_ms'] = wait_total / batched * 1000 if batched else 0.0
+        stats['max_wait_ms'] = stats.pop('wait_max') * 1000
+        stats['window_ms'] = self.window * 1000
+        stats['max_size'] = self.max_size
+        return stats
@@ -0,0 +1,280 @@
+import contextlib
+import json
+import os
+import time
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+# Tentativas de load_artifact quando o manifesto muda durante a carga
+LOAD_ATTEMPTS = 3
+
+# Parâmetros do TfidfVectorizer necessários para reproduzir a tokenização
+_ANALYZER_PARAMS = (
+    'analyzer', 'lowercase', 'strip_accents', 'token_pattern',
+    'ngram_range', 'stop_words'
+)
+
+
+def is_artifact_path(path):
+    """
+    Indica se `path` aponta para o formato em diretório (e não para um pickle).
+
+    Qualquer caminho que não termine em `.pkl`/`.pickle` é tratado como
+    diretório de artefato, exista ele ou não.
+    """
+    if os.path.isdir(path):
+        return True
+    return not str(path).endswith(('.pkl', '.pickle'))
+
+
+def artifact_exists(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@contextlib.contextmanager
+def publish_lock(model_path):
+    """
+    Lock exclusivo entre processos para publicar um modelo em `model_path`
+    (arquivo `<model_path>.lock` ao lado). Quem lê o modelo não precisa dele:
+    só impede que dois escritores (workers, jobs de treino) se sobrescrevam.
+    """
+    lock_path = f"{os.path.normpath(model_path)}.lock"
+    os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+    with open(lock_path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class MappedVectorizer:
+    """
+    TF-IDF somente leitura sobre arrays mapeados em memória.
+
+    O vocabulário fica em um array ordenado de tokens UTF-8 e a busca é feita
+    com `np.searchsorted`, então não existe um dict por processo: as páginas
+    de `tokens` e `idf` são compartilhadas entre os workers pelo page cache.
+    """
+
+    def __init__(self, tokens, idf, params):
+        self.tokens = tokens
+        self.idf = idf
+        self.params = params
+        self._analyzer = TfidfVectorizer(
+            **{k: params[k] for k in _ANALYZER_PARAMS}
+        ).build_analyzer()
+
+    @property
+    def n_features(self):
+        return len(self.tokens)
+
+    def build_analyzer(self):
+        return self._analyzer
+
+    def get_feature_names_out(self):
+        return np.char.decode(np.asarray(self.tokens), 'utf-8').astype(object)
+
+    def transform(self, texts):
+        n_features = self.n_features
+        indptr = [0]
+        indices = []
+        for text in texts:
+            terms = self._analyzer(text)
+            if terms:
+                keys = np.array([t.encode('utf-8') for t in terms])
+                pos = np.searchsorted(self.tokens, keys)
+                pos[pos >= n_features] = 0
+                cols = pos[self.tokens[pos] == keys]
+                indices.append(cols)
+                indptr.append(indptr[-1] + len(cols))
+            else:
+                indptr.append(indptr[-1])
+
+        indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.intp)
+        data = np.ones(len(indices), dtype=np.float64)
+        X = sp.csr_matrix((data, indices, np.asarray(indptr)), shape=(len(indptr) - 1, n_features))
+        # Soma tokens repetidos (contagem de termos) e ordena os índices
+        X.sum_duplicates()
+
+        if self.params['binary']:
+            X.data[:] = 1.0
+        if self.params['sublinear_tf']:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.params['use_idf']:
+            X.data *= self.idf[X.indices]
+        if self.params['norm']:
+            X = normalize(X, norm=self.params['norm'], copy=False)
+        return X
+
+
+def _export_vectorizer(vectorizer, coef):
+    """
+    Converte um TfidfVectorizer treinado para (tokens, idf, coef, params) com
+    as colunas reordenadas pela ordem dos tokens em UTF-8
+    """
+    if isinstance(vectorizer, MappedVectorizer):
+        return (np.asarray(vectorizer.tokens), np.asarray(vectorizer.idf, dtype=np.float64),
+                np.asarray(coef, dtype=np.float32).ravel(), dict(vectorizer.params))
+
+    params = vectorizer.get_params()
+    if params.get('tokenizer') is not None or params.get('preprocessor') is not None \
+            or callable(params.get('analyzer')):
+        raise ValueError("Vetorizador com tokenizer/preprocessor customizado não pode ser exportado")
+
+    stop_words = params['stop_words']
+    if stop_words is not None and not isinstance(stop_words, str):
+        stop_words = sorted(stop_words)
+
+    vec_params = {
+        'analyzer': params['analyzer'],
+        'lowercase': params['lowercase'],
+        'strip_accents': params['strip_accents'],
+        'token_pattern': params['token_pattern'],
+        'ngram_range': list(params['ngram_range']),
+        'stop_words': stop_words,
+        'norm': params['norm'],
+        'use_idf': params['use_idf'],
+        'sublinear_tf': params['sublinear_tf'],
+        'binary': params['binary'],
+    }
+
+    # Reordenar as colunas pela ordem dos tokens em UTF-8 para permitir busca binária
+    vocabulary = vectorizer.vocabulary_
+    words = sorted(vocabulary, key=lambda w: w.encode('utf-8'))
+    columns = np.fromiter((vocabulary[w] for w in words), dtype=np.intp, count=len(words))
+    tokens = np.array([w.encode('utf-8') for w in words])
+
+    if params['use_idf']:
+        idf = np.asarray(vectorizer.idf_, dtype=np.float64)[columns]
+    else:
+        idf = np.ones(len(words), dtype=np.float64)
+    coef = np.asarray(coef, dtype=np.float32).ravel()[columns]
+    return tokens, idf, coef, vec_params
+
+
+def save_artifact(path, vectorizer, coef, intercept, classes, metrics=None):
+    """
+    Grava o modelo linear no formato em diretório.
+
+    Os arrays recebem o nome da versão e o manifesto é trocado por último com
+    `os.replace`, então um leitor sempre enxerga um conjunto consistente.
+    Depois da troca são removidos os arrays de versões anteriores, exceto os
+    da versão que acabou de ser substituída: um leitor que leu o manifesto
+    antigo ainda consegue abri-los (ver `load_artifact`). Processos que já
+    mapeiam arquivos removidos continuam válidos até fecharem o arquivo.
+    """
+    tokens, idf, coef, vec_params = _export_vectorizer(vectorizer, coef)
+
+    os.makedirs(path, exist_ok=True)
+    try:
+        previous = read_manifest(path).get('files', {})
+    except (OSError, ValueError):
+        previous = {}
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.urandom(3).hex()}"
+    files = {
+        'tokens': f'tokens-{version}.npy',
+        'idf': f'idf-{version}.npy',
+        'coef': f'coef-{version}.npy',
+    }
+    np.save(os.path.join(path, files['tokens']), tokens)
+    np.save(os.path.join(path, files['idf']), idf)
+    np.save(os.path.join(path, files['coef']), coef)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'n_features': len(tokens),
+        'classes': [str(c) for c in classes],
+        'intercept': float(intercept),
+        'vectorizer': vec_params,
+        'files': files,
+        'metrics': metrics or {},
+    }
+    tmp_path = os.path.join(path, f'.{MANIFEST_NAME}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(path, MANIFEST_NAME))
+
+    # Limpar arrays de versões anteriores, menos os da versão substituída
+    keep = set(files.values()) | set(previous.values())
+    for name in os.listdir(path):
+        if name.endswith('.npy') and name not in keep:
+            try:
+                os.remove(os.path.join(path, name))
+            except OSError:
+                pass
+
+    return manifest
+
+
+def load_artifact(path):
+    """
+    Carrega um artefato em diretório com os arrays mapeados (`mmap_mode='r'`).
+
+    Retorna `(manifest, vectorizer, coef)`. Se os arrays sumirem entre a
+    leitura do manifesto e a abertura (duas publicações seguidas durante a
+    carga), tenta de novo com o manifesto novo, até LOAD_ATTEMPTS vezes.
+    """
+    manifest = read_manifest(path)
+    for attempt in range(1, LOAD_ATTEMPTS + 1):
+        try:
+            return _load_version(path, manifest)
+        except FileNotFoundError:
+            latest = read_manifest(path)
+            if attempt == LOAD_ATTEMPTS or latest.get('version') == manifest.get('version'):
+                raise
+            manifest = latest
+
+
+def _load_version(path, manifest):
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Formato de modelo não suportado: {manifest.get('format_version')}")
+
+    files = manifest['files']
+    tokens = np.load(os.path.join(path, files['tokens']), mmap_mode='r')
+    idf = np.load(os.path.join(path, files['idf']), mmap_mode='r')
+    coef = np.load(os.path.join(path, files['coef']), mmap_mode='r')
+
+    if not (len(tokens) == len(idf) == len(coef) == manifest['n_features']):
+        raise ValueError("Artefato de modelo inconsistente")
+
+    vec_params = dict(manifest['vectorizer'])
+    vec_params['ngram_range'] = tuple(vec_params['ngram_range'])
+    vectorizer = MappedVectorizer(tokens, idf, vec_params)
+    return manifest, vectorizer, coef
@@ -0,0 +1,37 @@
+import os
+import threading
+
+
+class PerProcess:
+    """
+    Objeto criado sob demanda, um por processo.
+
+    Threads (e os executores que as usam) não sobrevivem a um fork: depois do
+    fork do gunicorn cada worker precisa criar os seus. `get(factory)` chama
+    `factory()` na primeira vez em cada processo e depois devolve o mesmo
+    objeto, inclusive None (ex.: recurso desativado na configuração).
+    """
+
+    def __init__(self):
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self, factory):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._value = factory()
+                    self._pid = os.getpid()
+        return self._value
+
+    def current(self):
+        """Objeto deste processo sem criá-lo; None se ainda não existir"""
+        return self._value if self._pid == os.getpid() else None
+
+    def discard(self, value):
+        """Esquece `value` se ainda for o objeto deste processo; o próximo get() cria outro"""
+        with self._lock:
+            if self._pid == os.getpid() and self._value is value:
+                self._pid = None
+                self._value = None
@@ -1,27 +1,88 @@
+import json
 import pickle
 import os
-import math
-from sklearn.svm import SVC
+import numpy as np
+from app.utils import model_artifact
+from sklearn.svm import SVC, LinearSVC
+from sklearn.linear_model import SGDClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, classification_report
 from sklearn.feature_extraction.text import TfidfVectorizer
 import pandas as pd
 
 
+# Backends de treino disponíveis; todos são lineares e expõem `coef_`,
+# então usam o mesmo pontuador compilado e a mesma explicação
+TRAIN_BACKENDS = {
+    # libsvm: entre O(n²) e O(n³) no número de amostras
+    'svc': lambda random_state: SVC(kernel='linear', C=1.0, random_state=random_state),
+    # liblinear: aproximadamente linear no número de amostras
+    'linear_svc': lambda random_state: LinearSVC(C=1.0, random_state=random_state),
+    # Gradiente estocástico com perda hinge (SVM linear), suporta partial_fit
+    'sgd': lambda random_state: SGDClassifier(
+        loss='hinge', alpha=1e-4, max_iter=50, tol=1e-4, random_state=random_state
+    ),
+}
+
+
 class SpamDetector:
     """Classe para detectar spam em mensagens usando SVM"""
     
-    def __init__(self, model_path='spam_model.pkl', vectorizer_path='vectorizer.pkl'):
+    def __init__(self, model_path='spam_model.pkl', vectorizer_path='vectorizer.pkl', autoload=True,
+                 backend='svc'):
+        if backend not in TRAIN_BACKENDS:
+            raise ValueError(f"Backend de treino desconhecido: {backend}")
+        
         self.model_path = model_path
         self.vectorizer_path = vectorizer_path
+        self.backend = backend
         self.model = None
         self.vectorizer = None
         self.metrics = {}
         
+        # Pontuador linear compilado (ver `_export_linear`)
+        self.coef_ = None
+        self.intercept_ = 0.0
+        self.classes_ = None
+        
+        # Tabela índice -> token do vocabulário (ver `_build_token_index`)
+        self._tokens = None
+        
+        # Versão do artefato carregado (manifesto ou mtime do pickle)
+        self.version = None
+        
         # Carregar modelo e vetorizador se existirem
-        if os.path.exists(model_path) and os.path.exists(vectorizer_path):
+        if autoload and self.model_exists():
             self.load_model()
     
+    def uses_artifact(self):
+        """Indica se `model_path` usa o formato em diretório mapeado em memória"""
+        return model_artifact.is_artifact_path(self.model_path)
+    
+    def model_exists(self):
+        """Verifica se há um modelo salvo em `model_path`"""
+        if self.uses_artifact():
+            return model_artifact.artifact_exists(self.model_path)
+        return os.path.exists(self.model_path) and os.path.exists(self.vectorizer_path)
+    
+    def disk_version(self):
+        """
+        Versão do modelo salvo em disco, sem carregá-lo.
+
+        No formato em diretório é a versão do manifesto; para pickles é o
+        mtime do arquivo do modelo. Retorna None se não houver modelo salvo.
+        """
+        try:
+            if self.uses_artifact():
+                return model_artifact.read_manifest(self.model_path)['version']
+            return str(os.path.getmtime(self.model_path))
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def is_loaded(self):
+        """Indica se há um modelo pronto para predição"""
+        return self.vectorizer is not None and (self.coef_ is not None or self.model is not None)
+    
     def load_data(self, csv_path):
         """Carrega dados do CSV"""
         df = pd.read_csv(csv_path)
@@ -30,10 +91,11 @@ class SpamDetector:
         return X, y
     
     def train(self, X, y, test_size=0.3, random_state=42):
-        """Treina o modelo SVM com TF-IDF"""
+        """Treina o modelo linear (backend em `self.backend`) com TF-IDF"""
         # Vetorizar
         self.vectorizer = TfidfVectorizer()
         X_tfidf = self.vectorizer.fit_transform(X)
+        self._build_token_index()
         
         # Dividir dados
         X_train, X_test, y_train, y_test = train_test_split(
@@ -41,18 +103,61 @@ class SpamDetector:
         )
         
         # Treinar modelo
-        self.model = SVC(kernel='linear', C=1.0, random_state=random_state)
+        self.model = TRAIN_BACKENDS[self.backend](random_state)
         self.model.fit(X_train, y_train)
+        self._export_linear()
+        
+        # Conferir se o pontuador compilado concorda com o sklearn
+        if self.coef_ is not None and not self.check_linear_scorer(X_test):
+            raise ValueError("Pontuador linear compilado diverge do modelo sklearn")
         
         # Avaliar
         y_pred = self.model.predict(X_test)
         self._calculate_metrics(y_test, y_pred)
         
-        print("Modelo SVM treinado com sucesso!")
+        print(f"Modelo SVM treinado com sucesso! (backend: {self.backend})")
         print(f"Acurácia: {self.metrics['accuracy']:.4f}")
         
         return X_test, y_test, y_pred
     
+    def with_feedback(self, texts, labels, learning_rate=0.01, alpha=1e-4):
+        """
+        Aplica correções (texto, rótulo) incrementalmente e retorna um novo detector.
+
+        O vocabulário e o idf ficam congelados: os textos passam pelo mesmo
+        vetorizador já treinado e só os pesos lineares mudam, via
+        `SGDClassifier.partial_fit` iniciado a partir do `coef_` atual.
+        Palavras fora do vocabulário são ignoradas até o próximo treino completo.
+        O detector atual não é modificado, então pode continuar servindo.
+        """
+        if not self.is_loaded() or self.coef_ is None:
+            raise ValueError("Aprendizado incremental requer um modelo linear carregado.")
+        
+        labels = np.asarray(labels)
+        unknown = set(labels) - set(self.classes_)
+        if unknown:
+            raise ValueError(f"Rótulos desconhecidos: {', '.join(sorted(map(str, unknown)))}")
+        
+        X_tfidf = self.vectorizer.transform(list(texts))
+        
+        model = SGDClassifier(loss='hinge', alpha=alpha, learning_rate='constant', eta0=learning_rate)
+        model.coef_ = np.asarray(self.coef_, dtype=np.float64).reshape(1, -1).copy()
+        model.intercept_ = np.array([self.intercept_], dtype=np.float64)
+        model.partial_fit(X_tfidf, labels, classes=self.classes_)
+        
+        detector = SpamDetector(self.model_path, self.vectorizer_path, autoload=False, backend=self.backend)
+        detector.vectorizer = self.vectorizer
+        detector._tokens = self._tokens
+        detector.model = model
+        if self.metrics:
+            # As métricas continuam sendo as do último treino completo: ficam
+            # marcadas com a versão treinada e quantas correções vieram depois
+            detector.metrics = dict(self.metrics)
+            detector.metrics.setdefault('base_version', self.version)
+            detector.metrics['feedback_applied'] = self.metrics.get('feedback_applied', 0) + len(labels)
+        detector._export_linear()
+        return detector
+    
     def _calculate_metrics(self, y_test, y_pred):
         """Calcula métricas do modelo"""
         self.metrics = {
@@ -64,78 +169,184 @@ class SpamDetector:
             'classification_report': classification_report(y_test, y_pred)
         }
     
+    def _build_token_index(self):
+        """
+        Monta uma vez por modelo a tabela índice -> token usada nas explicações,
+        em vez de chamar `get_feature_names_out()` (O(vocabulário)) a cada
+        requisição. No formato mapeado a própria tabela de tokens (bytes
+        UTF-8 ordenados) serve, decodificada só nos índices pedidos.
+        """
+        if self.vectorizer is None:
+            self._tokens = None
+        elif isinstance(self.vectorizer, model_artifact.MappedVectorizer):
+            self._tokens = self.vectorizer.tokens
+        else:
+            self._tokens = self.vectorizer.get_feature_names_out()
+
+    def _token_names(self, indices):
+        names = self._tokens[indices]
+        if names.dtype.kind == 'S':
+            return [name.decode('utf-8') for name in names]
+        return [str(name) for name in names]
+
+    def _top_contributions(self, indices, values, k):
+        """
+        As `k` palavras de maior contribuição (peso * tf-idf) de uma linha
+        esparsa, dadas só pelos seus índices e valores não nulos: o custo
+        depende do tamanho da mensagem, não do vocabulário.
+        """
+        weights = self.coef_[indices]
+        contributions = weights * values
+        if len(contributions) > k:
+            top = np.argpartition(-contributions, k - 1)[:k]
+        else:
+            top = np.arange(len(contributions))
+        top = top[np.argsort(-contributions[top], kind='stable')]
+        return [
+            {'word': word, 'weight': float(weight), 'contribution': float(contribution)}
+            for word, weight, contribution in zip(
+                self._token_names(indices[top]), weights[top], contributions[top]
+            )
+        ]
+
+    def _export_linear(self):
+        """
+        Reduz um modelo linear a um vetor denso de pesos float32 + intercepto.
+
+        Com `coef_` exportado a predição vira um produto escalar esparso e não
+        passa mais pelo wrapper libsvm do sklearn. Para kernels não lineares o
+        pontuador compilado fica desativado e `_score` usa o próprio modelo.
+        """
+        self.coef_ = None
+        self.intercept_ = 0.0
+        self.classes_ = None
+        
+        if self.model is None:
+            return
+        
+        self.classes_ = np.asarray(self.model.classes_)
+        if getattr(self.model, 'kernel', 'linear') != 'linear' or len(self.classes_) != 2:
+            return
+        
+        coef = self.model.coef_
+        if hasattr(coef, 'toarray'):
+            coef = coef.toarray()
+        self.coef_ = np.ascontiguousarray(np.asarray(coef, dtype=np.float32).ravel())
+        self.intercept_ = float(np.asarray(self.model.intercept_).ravel()[0])
+    
+    def _margins(self, X_tfidf):
+        """Distância ao hiperplano para cada linha de `X_tfidf`"""
+        if self.coef_ is not None:
+            return np.asarray(X_tfidf @ self.coef_, dtype=np.float64).ravel() + self.intercept_
+        return np.asarray(self.model.decision_function(X_tfidf), dtype=np.float64).ravel()
+    
+    def check_linear_scorer(self, X_tfidf, atol=1e-4):
+        """
+        Confere se o pontuador compilado e o `decision_function` do sklearn
+        dão a mesma resposta para as linhas de `X_tfidf`
+        """
+        if self.coef_ is None or self.model is None:
+            return False
+        
+        compiled = self._margins(X_tfidf)
+        reference = np.asarray(self.model.decision_function(X_tfidf), dtype=np.float64).ravel()
+        return bool(np.allclose(compiled, reference, atol=atol) and
+                    np.array_equal(compiled > 0, reference > 0))
+    
+    def _score(self, X_tfidf):
+        """
+        Núcleo de pontuação compartilhado por todas as predições.
+
+        Calcula a margem uma única vez e deriva dela o rótulo (sinal da
+        margem, igual ao `predict` do SVC binário) e a confiança normalizada
+        por uma sigmoide para [0, 1].
+        """
+        margins = self._margins(X_tfidf)
+        labels = np.where(margins > 0, self.classes_[1], self.classes_[0])
+        probs = 1.0 / (1.0 + np.exp(-np.clip(margins, -500, 500)))
+        return labels, probs
+
+    def _analyzer_param(self, name):
+        if isinstance(self.vectorizer, model_artifact.MappedVectorizer):
+            return self.vectorizer.params.get(name)
+        return getattr(self.vectorizer, name, None)
+
+    def normalize_text(self, text):
+        """
+        Forma canônica de `text` com o mesmo vetor TF-IDF (usada como chave
+        de cache). Com o analisador de palavras padrão, caixa (se `lowercase`)
+        e espaços em branco não mudam os tokens; com outros analisadores o
+        texto é mantido como está.
+        """
+        if (self._analyzer_param('analyzer') != 'word'
+                or self._analyzer_param('token_pattern') != r'(?u)\b\w\w+\b'
+                or self._analyzer_param('preprocessor') is not None
+                or self._analyzer_param('tokenizer') is not None):
+            return text
+        if self._analyzer_param('lowercase'):
+            text = text.lower()
+        return ' '.join(text.split())
+
     def predict(self, text):
         """Prediz se uma mensagem é spam"""
-        if self.model is None or self.vectorizer is None:
+        if not self.is_loaded():
             raise ValueError("Modelo não carregado. Treine o modelo primeiro.")
         
         X_tfidf = self.vectorizer.transform([text])
-        prediction = self.model.predict(X_tfidf)[0]
-        # `decision_function` retorna a distância ao hiperplano (pode ser negativa).
-        # Normalizamos este valor usando uma sigmoide para mapear para [0, 1]
-        # e retornar uma 'confidence' compreensível como probabilidade.
-        raw_conf = float(self.model.decision_function(X_tfidf)[0])
-        prob = 1.0 / (1.0 + math.exp(-raw_conf))
+        labels, probs = self._score(X_tfidf)
 
         return {
             'text': text,
-            'label': prediction,
-            'confidence': float(prob)
+            'label': str(labels[0]),
+            'confidence': float(probs[0])
         }
     
+    def predict_batch(self, texts):
+        """
+        Prediz uma lista de mensagens de uma vez, mantendo a ordem de entrada
+        """
+        if not self.is_loaded():
+            raise ValueError("Modelo não carregado. Treine o modelo primeiro.")
+
+        texts = list(texts)
+        if not texts:
+            return []
+
+        # Uma única matriz esparsa e uma única passada de pontuação
+        # para o lote inteiro
+        X_tfidf = self.vectorizer.transform(texts)
+        labels, probs = self._score(X_tfidf)
+
+        return [
+            {
+                'text': text,
+                'label': str(label),
+                'confidence': float(prob)
+            }
+            for text, label, prob in zip(texts, labels, probs)
+        ]
+
     def predict_with_explanation(self, text):
         """
         Prediz e retorna explicação detalhada sobre por que é spam ou não
         """
-        if self.model is None or self.vectorizer is None:
+        if not self.is_loaded():
             raise ValueError("Modelo não carregado. Treine o modelo primeiro.")
         
         # Fazer predição
         X_tfidf = self.vectorizer.transform([text])
-        prediction = self.model.predict(X_tfidf)[0]
-        confidence = self.model.decision_function(X_tfidf)[0]
-        
-        # Normalizar confiança: mapear o valor bruto (distance) para probabilidade [0-1]
-        raw_conf = float(confidence)
-        prob = 1.0 / (1.0 + math.exp(-raw_conf))
-        
-        # Obter feature names
-        feature_names = self.vectorizer.get_feature_names_out()
-        
-        # Obter coeficientes do modelo (pesos das palavras)
-        # Para kernel linear, coef_ é acessível
-        if self.model.kernel == 'linear':
-            coefs = self.model.coef_.toarray()[0]
-            
-            # Encontrar palavras na mensagem que contribuíram para a decisão
-            # Primeiro, pegar índices não-zero do vetor da mensagem
-            msg_vector = X_tfidf.toarray()[0]
-            word_indices = msg_vector.nonzero()[0]
-            
-            explanation = []
-            for idx in word_indices:
-                word = feature_names[idx]
-                weight = coefs[idx]
-                # TF-IDF score da palavra na mensagem
-                tfidf_score = msg_vector[idx]
-                # Contribuição = peso * tfidf
-                contribution = weight * tfidf_score
-                
-                explanation.append({
-                    'word': word,
-                    'weight': float(weight),
-                    'contribution': float(contribution)
-                })
-            
-            # Ordenar por contribuição (absoluta ou sinalizada dependendo do interesse)
-            # Spam geralmente tem contribuição positiva alta
-            explanation.sort(key=lambda x: x['contribution'], reverse=True)
-            
+        labels, probs = self._score(X_tfidf)
+        prediction = str(labels[0])
+        prob = float(probs[0])
+        
+        # Para kernel linear, a contribuição de cada palavra é peso * tf-idf;
+        # só as palavras presentes na mensagem (não nulos da linha) entram
+        if self.coef_ is not None:
             return {
                 'text': text,
                 'label': prediction,
                 'confidence': prob,
-                'explanation': explanation[:10]  # Top 10 palavras influentes
+                'explanation': self._top_contributions(X_tfidf.indices, X_tfidf.data, 10)  # Top 10 palavras influentes
             }
         
         return {
@@ -145,25 +356,155 @@ class SpamDetector:
             'explanation': "Explicação disponível apenas para kernel linear"
         }
 
+    def predict_with_explanation_batch(self, texts, k=10):
+        """
+        Prediz uma lista de mensagens e retorna, para cada uma, as `k` palavras
+        que mais empurram para cada classe: `top_positive` (contribuição > 0,
+        rumo a `classes_[1]`) e `top_negative` (contribuição < 0, rumo a
+        `classes_[0]`).
+
+        As contribuições (peso * tf-idf) de todas as linhas saem de uma única
+        operação sobre os não nulos da matriz CSR; a seleção por linha é feita
+        ordenando os não nulos por (linha, contribuição), sem laço por palavra.
+        """
+        if not self.is_loaded():
+            raise ValueError("Modelo não carregado. Treine o modelo primeiro.")
+        if self.coef_ is None:
+            raise ValueError("Explicação disponível apenas para kernel linear")
+
+        texts = list(texts)
+        if not texts:
+            return []
+
+        X_tfidf = self.vectorizer.transform(texts)
+        labels, probs = self._score(X_tfidf)
+
+        indptr = X_tfidf.indptr
+        rows = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        weights = self.coef_[X_tfidf.indices]
+        contributions = weights * X_tfidf.data
+
+        # Dentro de cada linha: maior contribuição primeiro
+        order = np.lexsort((-contributions, rows))
+        position = np.arange(len(order))
+        rank = position - indptr[rows]
+        rank_from_end = indptr[rows + 1] - 1 - position
+        sorted_contributions = contributions[order]
+        positive = order[(rank < k) & (sorted_contributions > 0)]
+        negative = order[(rank_from_end < k) & (sorted_contributions < 0)][::-1]
+
+        words = {}
+        selected = np.concatenate([positive, negative])
+        for entry, word in zip(selected.tolist(), self._token_names(X_tfidf.indices[selected])):
+            words[entry] = word
+
+        def group(entries):
+            by_row = [[] for _ in texts]
+            for entry in entries.tolist():
+                by_row[rows[entry]].append({
+                    'word': words[entry],
+                    'weight': float(weights[entry]),
+                    'contribution': float(contributions[entry])
+                })
+            return by_row
+
+        top_positive = group(positive)
+        top_negative = group(negative)
+        return [
+            {
+                'text': text,
+                'label': str(labels[i]),
+                'confidence': float(probs[i]),
+                'top_positive': top_positive[i],
+                'top_negative': top_negative[i]
+            }
+            for i, text in enumerate(texts)
+        ]
+
     def save_model(self):
         """Salva o modelo e vetorizador em disco"""
-        with open(self.model_path, 'wb') as f:
-            pickle.dump(self.model, f)
-        with open(self.vectorizer_path, 'wb') as f:
-            pickle.dump(self.vectorizer, f)
+        if self.uses_artifact():
+            if self.coef_ is None:
+                raise ValueError("Formato em diretório suporta apenas modelos lineares")
+            manifest = model_artifact.save_artifact(
+                self.model_path, self.vectorizer, self.coef_, self.intercept_,
+                self.classes_, metrics=self.metrics
+            )
+            self.version = manifest['version']
+            print(f"Modelo salvo em {self.model_path} (versão {self.version})")
+            return
+        
+        # Métricas e vetorizador são gravados antes: o mtime do modelo marca a
+        # versão e só muda quando os arquivos já estão completos no disco
+        self._dump_metrics()
+        self._dump_pickle(self.vectorizer, self.vectorizer_path)
+        self._dump_pickle(self.model, self.model_path)
+        self.version = str(os.path.getmtime(self.model_path))
         print(f"Modelo salvo em {self.model_path} e {self.vectorizer_path}")
 
+    @staticmethod
+    def _dump_pickle(obj, path):
+        """Grava um pickle via arquivo temporário + os.replace"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(obj, f)
+        os.replace(tmp_path, path)
+
+    def metrics_path(self):
+        """Arquivo com as métricas do modelo em pickle (no diretório elas ficam no manifesto)"""
+        return f"{self.model_path}.metrics.json"
+
+    def _dump_metrics(self):
+        tmp_path = f"{self.metrics_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.metrics, f, ensure_ascii=False)
+        os.replace(tmp_path, self.metrics_path())
+
+    def _load_metrics(self):
+        try:
+            with open(self.metrics_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
     def load_model(self):
         """Carrega o modelo e vetorizador do disco"""
+        if self.uses_artifact():
+            self._load_artifact()
+            return
+        
         try:
             with open(self.model_path, 'rb') as f:
                 self.model = pickle.load(f)
             with open(self.vectorizer_path, 'rb') as f:
                 self.vectorizer = pickle.load(f)
+            self.version = str(os.path.getmtime(self.model_path))
+            self.metrics = self._load_metrics()
+            self._build_token_index()
         except Exception as e:
             print(f"Erro ao carregar modelo: {e}")
             self.model = None
             self.vectorizer = None
+        
+        self._export_linear()
+    
+    def _load_artifact(self):
+        """Carrega o formato em diretório; não há objeto sklearn para servir"""
+        self.model = None
+        try:
+            manifest, self.vectorizer, self.coef_ = model_artifact.load_artifact(self.model_path)
+            self._build_token_index()
+            self.intercept_ = manifest['intercept']
+            self.classes_ = np.asarray(manifest['classes'])
+            self.metrics = manifest.get('metrics') or {}
+            self.version = manifest['version']
+        except Exception as e:
+            print(f"Erro ao carregar modelo: {e}")
+            self.vectorizer = None
+            self._tokens = None
+            self.coef_ = None
+            self.classes_ = None
+            self.version = None
 
     def get_metrics(self):
         """Retorna as métricas do último treinamento"""
@@ -0,0 +1,46 @@
+import sys
+
+from app import create_app
+from app.services import archive_service
+
+
+def main():
+    """
+    Move para arquivos JSONL gzip (um por dia, em EMAILS_ARCHIVE_DIR) os emails
+    recebidos há mais de N dias e libera o espaço no banco. Pode rodar por cron
+    com o servidor no ar: cada lote é uma transação curta.
+
+    Bancos criados antes do arquivamento não estão em auto_vacuum=INCREMENTAL
+    e o espaço só volta ao sistema depois de convertê-los uma vez com
+    --vacuum-full (VACUUM completo: reescreve o arquivo e bloqueia as escritas
+    enquanto roda, então prefira uma janela de manutenção).
+
+    Uso: python archive_emails.py [dias] [--vacuum-full]   (padrão: EMAILS_RETENTION_DAYS)
+    """
+    vacuum_full = '--vacuum-full' in sys.argv[1:]
+    args = [a for a in sys.argv[1:] if a != '--vacuum-full']
+    app = create_app('production')
+
+    if vacuum_full:
+        with app.app_context():
+            converted = archive_service.enable_incremental_vacuum()
+        print("Banco convertido para auto_vacuum=INCREMENTAL" if converted
+              else "Banco já estava em auto_vacuum=INCREMENTAL")
+
+    days = int(args[0]) if args else app.config['EMAILS_RETENTION_DAYS']
+    if days <= 0:
+        if vacuum_full:
+            return
+        print("Retenção desativada (EMAILS_RETENTION_DAYS=0). Informe os dias: python archive_emails.py 90")
+        return
+
+    with app.app_context():
+        result = archive_service.archive_emails(
+            days, app.config['EMAILS_ARCHIVE_DIR'], app.config['EMAILS_ARCHIVE_BATCH_SIZE']
+        )
+    print(f"{result['archived']} emails anteriores a {result['cutoff']} arquivados em "
+          f"{result['batches']} lotes ({result['freed_pages']} páginas liberadas)")
+
+
+if __name__ == '__main__':
+    main()
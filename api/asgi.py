@@ -0,0 +1,20 @@
+import gc
+import os
+
+from app import create_app
+from app.asgi import AsgiApp
+from app.models.email import db
+from app.services import spam_service
+
+# Ponto de entrada ASGI (event loop): uvicorn asgi:app, ou com vários
+# processos gunicorn -c gunicorn.conf.py -k uvicorn_worker.UvicornWorker asgi:app.
+# Mesmo preparo do wsgi.py: modelo carregado antes do fork e fora do GC.
+flask_app = create_app(os.getenv('FLASK_CONFIG') or 'production')
+
+with flask_app.app_context():
+    spam_service.preload()
+    db.engine.dispose()
+
+app = AsgiApp(flask_app)
+
+gc.freeze()
@@ -0,0 +1,110 @@
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Banco temporário: este script nunca toca em data/emails.db
+_tmp_dir = tempfile.mkdtemp(prefix='bench_emails_')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(_tmp_dir, "bench.db")}'
+
+from app import create_app
+from app.models.email import db, EmailRecord, SNIPPET_LENGTH
+from app.services import email_service
+
+
+def populate(db_path, n_rows, batch=50000):
+    """Insere `n_rows` emails sintéticos direto pelo sqlite3 (rápido)"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('DELETE FROM emails')
+    start = datetime(2024, 1, 1)
+    rng = random.Random(42)
+    recipients = [f'user{i}@example.com' for i in range(200)]
+    body = 'corpo ' * 20
+    rows = []
+    for i in range(n_rows):
+        rows.append((
+            'sender@example.com', rng.choice(recipients), f'Assunto {i}', body, body[:SNIPPET_LENGTH],
+            (start + timedelta(seconds=rng.randrange(365 * 24 * 3600))).isoformat(sep=' '),
+            rng.random() < 0.15, rng.random()
+        ))
+        if len(rows) >= batch:
+            conn.executemany(
+                'INSERT INTO emails (sender, recipient, subject, body, snippet, received, is_spam, spam_score) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows
+            )
+            rows = []
+    if rows:
+        conn.executemany(
+            'INSERT INTO emails (sender, recipient, subject, body, snippet, received, is_spam, spam_score) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows
+        )
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+
+
+def set_indexes(enabled):
+    for index in EmailRecord.__table__.indexes:
+        if enabled:
+            index.create(bind=db.engine, checkfirst=True)
+        else:
+            index.drop(bind=db.engine, checkfirst=True)
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('ANALYZE')
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        db.session.expire_all()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def deep_cursor(limit, pages, **filters):
+    cursor = None
+    for _ in range(pages):
+        _, cursor = email_service.list_emails(limit=limit, cursor=cursor, **filters)
+    return cursor
+
+
+def run_queries(limit=100):
+    cursor = deep_cursor(limit, 50)
+    spam_cursor = deep_cursor(limit, 20, is_spam=True)
+    return {
+        'página 1': timed(lambda: email_service.list_emails(limit=limit)),
+        'página 51': timed(lambda: email_service.list_emails(limit=limit, cursor=cursor)),
+        'is_spam p1': timed(lambda: email_service.list_emails(limit=limit, is_spam=True)),
+        'is_spam p21': timed(lambda: email_service.list_emails(limit=limit, cursor=spam_cursor, is_spam=True)),
+        'recipient p1': timed(lambda: email_service.list_emails(limit=limit, recipient='user7@example.com')),
+    }
+
+
+def main():
+    """
+    Mede a latência de GET /emails (camada de serviço) com e sem os índices
+    de `emails`, para 10k, 100k e 1M linhas (ou os tamanhos passados).
+    """
+    sizes = [int(s) for s in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    app = create_app('production')
+    db_path = os.path.join(_tmp_dir, 'bench.db')
+
+    with app.app_context():
+        print(f"{'linhas':>9} {'consulta':<13} {'sem índice (ms)':>16} {'com índice (ms)':>16}")
+        for n_rows in sizes:
+            populate(db_path, n_rows)
+            set_indexes(False)
+            before = run_queries()
+            set_indexes(True)
+            after = run_queries()
+            for name in before:
+                print(f"{n_rows:>9} {name:<13} {before[name]:>16.2f} {after[name]:>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+
+def run(app, n_threads, duration):
+    """`n_threads` threads chamando spam_service.predict com textos sempre novos"""
+    from app.services import spam_service
+
+    latencies = [[] for _ in range(n_threads)]
+    deadline = time.perf_counter() + duration
+
+    def worker(k):
+        i = 0
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                text = f'Congratulations! You won a free prize, call now {k} {i}'
+                start = time.perf_counter()
+                spam_service.predict(text)
+                latencies[k].append(time.perf_counter() - start)
+                i += 1
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    all_latencies = np.concatenate([np.array(l) for l in latencies]) * 1000
+    return len(all_latencies) / duration, np.percentile(all_latencies, 50), np.percentile(all_latencies, 99)
+
+
+def main():
+    """
+    Vazão e latência de spam_service.predict com N threads concorrentes, sem
+    micro-lotes e com algumas janelas (cache de predições desativado).
+
+    Uso: python bench_predict.py [segundos] [threads...]
+    Requer um modelo treinado (MODEL_PATH).
+    """
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    thread_counts = [int(n) for n in sys.argv[2:]] or [1, 8, 32]
+
+    os.environ['PREDICT_CACHE_SIZE'] = '0'
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+    # Banco temporário: o app aplica as migrações ao iniciar
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(prefix="bench_predict_"), "bench.db")}'
+
+    print(f"{'janela (ms)':>11} {'threads':>8} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'lote médio':>11}")
+    for window in ('0', '0.001', '0.002', '0.005'):
+        # Um processo novo por janela: a configuração é lida na primeira predição
+        for n_threads in thread_counts:
+            os.environ['MICROBATCH_WINDOW'] = window
+            code = (
+                "import sys, bench_predict as b; from app import create_app; from app.services import spam_service;"
+                "app = create_app('production');"
+                f"r = b.run(app, {n_threads}, {duration});"
+                "s = spam_service.get_batcher_stats() if float(sys.argv[1]) > 0 else None;"
+                "print(r[0], r[1], r[2], s['avg_batch_size'] if s else 1.0)"
+            )
+            out = os.popen(f'{sys.executable} -c "{code}" {window}').read().split()
+            rps, p50, p99, avg = map(float, out[-4:])
+            print(f"{float(window) * 1000:>11.0f} {n_threads:>8} {rps:>9.0f} {p50:>9.2f} {p99:>9.2f} {avg:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def _client(port, duration, client_id, results):
+    """Cliente com conexão persistente mandando /predict com textos sempre novos"""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    headers = {'Content-Type': 'application/json'}
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        body = json.dumps({'text': f'Congratulations! You won a free prize, call now {client_id} {i}'})
+        start = time.perf_counter()
+        try:
+            conn.request('POST', '/predict', body, headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+        i += 1
+    results.put((latencies, errors))
+
+
+def _wait_ready(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def _private_mb(pid):
+    """Memória exclusiva do processo (Private_Clean + Private_Dirty), só Linux"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return sum(int(fields[k].split()[0]) for k in ('Private_Clean', 'Private_Dirty')) / 1024
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _worker_pids(master_pid):
+    try:
+        with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        return []
+
+
+def run(workers, clients, duration, port):
+    env = dict(os.environ)
+    env.update({
+        'WEB_CONCURRENCY': str(workers),
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'PREDICT_CACHE_SIZE': '0',
+        'MODEL_RELOAD_INTERVAL': '0',
+        # Banco temporário: /predict não grava, mas o app aplica as migrações ao iniciar
+        'DATABASE_URL': f'sqlite:///{os.path.join(tempfile.mkdtemp(prefix="bench_server_"), "bench.db")}',
+    })
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not _wait_ready(port):
+            raise RuntimeError('gunicorn não respondeu em /health')
+
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Queue()
+        procs = [ctx.Process(target=_client, args=(port, duration, k, results)) for k in range(clients)]
+        for p in procs:
+            p.start()
+        latencies = []
+        errors = 0
+        for _ in procs:
+            client_latencies, client_errors = results.get()
+            latencies.extend(client_latencies)
+            errors += client_errors
+        for p in procs:
+            p.join()
+
+        memory = [m for m in (_private_mb(pid) for pid in _worker_pids(server.pid)) if m is not None]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'rps': len(latencies) / duration,
+        'p50': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+        'p99': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+        'errors': errors,
+        'private_mb': sum(memory) / len(memory) if memory else None,
+    }
+
+
+def main():
+    """
+    Teste de carga do servidor de produção (gunicorn + wsgi.py): sobe o
+    gunicorn com 1, 2, 4... workers e mede a vazão de POST /predict com
+    clientes concorrentes em processos separados, além da memória exclusiva
+    de cada worker (o modelo carregado no mestre é compartilhado).
+
+    Uso: python bench_server.py [segundos] [clientes] [workers...]
+    Requer gunicorn e um modelo treinado (MODEL_PATH).
+    """
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    cores = multiprocessing.cpu_count()
+    worker_counts = [int(n) for n in sys.argv[3:]] or sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+
+    print(f"{cores} núcleos, {clients} clientes, {duration:.0f}s por rodada\n")
+    print(f"{'workers':>8} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'erros':>6} {'MB privados/worker':>19}")
+    for workers in worker_counts:
+        r = run(workers, clients, duration, port=5100 + workers)
+        memory = f"{r['private_mb']:.1f}" if r['private_mb'] is not None else '-'
+        print(f"{workers:>8} {r['rps']:>9.0f} {r['p50']:>9.2f} {r['p99']:>9.2f} {r['errors']:>6} {memory:>19}")
+
+
+if __name__ == '__main__':
+    main()
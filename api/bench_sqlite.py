@@ -0,0 +1,110 @@
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from app.models.sqlite_tuning import PRAGMA_PROFILES
+
+
+class _ErrorCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.locked = 0
+        self.other = 0
+
+    def emit(self, record):
+        if 'locked' in record.getMessage():
+            self.locked += 1
+        else:
+            self.other += 1
+
+
+def _worker(role, duration, results):
+    """Processo que simula um worker do servidor fazendo /send ou GET /emails"""
+    from app import create_app
+
+    app = create_app('production')
+    errors = _ErrorCounter()
+    app.logger.addHandler(errors)
+    client = app.test_client()
+
+    ok = 0
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        if role == 'send':
+            r = client.post('/send', json={'message': f'See you at the meeting tomorrow {i}'})
+        else:
+            r = client.get('/emails?limit=50')
+        if r.status_code == 200:
+            ok += 1
+        elif r.status_code == 500 and 'locked' in r.get_data(as_text=True):
+            errors.locked += 1
+        else:
+            errors.other += 1
+        i += 1
+
+    # /send responde 200 mesmo se a gravação falhar; as falhas vêm do log
+    if role == 'send':
+        ok -= errors.locked + errors.other
+    results.put((role, ok, errors.locked, errors.other))
+
+
+def run_profile(profile, n_writers, n_readers, duration):
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench_sqlite_'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['SQLITE_PRAGMA_PROFILE'] = profile
+
+    # Criar o banco antes de iniciar os workers
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    setup = ctx.Process(target=_worker, args=('emails', 0.01, results))
+    setup.start()
+    setup.join()
+    results.get()
+
+    procs = [ctx.Process(target=_worker, args=('send', duration, results)) for _ in range(n_writers)]
+    procs += [ctx.Process(target=_worker, args=('emails', duration, results)) for _ in range(n_readers)]
+    for p in procs:
+        p.start()
+
+    totals = {'send': [0, 0, 0], 'emails': [0, 0, 0]}
+    for _ in procs:
+        role, ok, locked, other = results.get()
+        totals[role][0] += ok
+        totals[role][1] += locked
+        totals[role][2] += other
+    for p in procs:
+        p.join()
+    return totals
+
+
+def main():
+    """
+    Vazão de /send (gravação síncrona) + GET /emails concorrentes, com
+    processos separados (como workers do gunicorn), para cada perfil de PRAGMA.
+
+    Uso: python bench_sqlite.py [segundos] [escritores] [leitores]
+    Requer um modelo treinado (MODEL_PATH) para o /send.
+    """
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    n_writers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    n_readers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    os.environ['SEND_WRITE_BEHIND'] = 'false'
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+
+    print(f"{duration:.0f}s, {n_writers} processos /send + {n_readers} processos GET /emails\n")
+    print(f"{'perfil':<12} {'/send req/s':>12} {'/emails req/s':>14} {'locked':>8} {'outros erros':>13}")
+    for profile in PRAGMA_PROFILES:
+        totals = run_profile(profile, n_writers, n_readers, duration)
+        locked = totals['send'][1] + totals['emails'][1]
+        other = totals['send'][2] + totals['emails'][2]
+        print(f"{profile:<12} {totals['send'][0] / duration:>12.1f} {totals['emails'][0] / duration:>14.1f} "
+              f"{locked:>8} {other:>13}")
+
+
+if __name__ == '__main__':
+    main()
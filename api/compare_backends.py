@@ -0,0 +1,33 @@
+import sys
+import time
+from app.utils.spam_detector import SpamDetector, TRAIN_BACKENDS
+
+
+def main():
+    """
+    Compara tempo de treino e métricas dos backends de treino no mesmo CSV.
+    Nenhum modelo é salvo.
+    """
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'data/sms_spam_hf.csv'
+
+    print(f"Carregando dados de {csv_path}...")
+    X, y = SpamDetector(autoload=False).load_data(csv_path)
+    print(f"Total de mensagens carregadas: {len(X)}\n")
+
+    rows = []
+    for backend in TRAIN_BACKENDS:
+        detector = SpamDetector(autoload=False, backend=backend)
+        start = time.perf_counter()
+        detector.train(X, y)
+        elapsed = time.perf_counter() - start
+        rows.append((backend, elapsed, detector.get_metrics()))
+
+    print("\n=== Comparação de Backends ===")
+    print(f"{'backend':<12} {'treino (s)':>10} {'acurácia':>9} {'precisão':>9} {'recall':>9} {'f1':>9}")
+    for backend, elapsed, m in rows:
+        print(f"{backend:<12} {elapsed:>10.3f} {m['accuracy']:>9.4f} {m['precision']:>9.4f} "
+              f"{m['recall']:>9.4f} {m['f1']:>9.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,7 @@ Este arquivo demonstra como usar a API em diferentes cenários.
 import requests
 import json
 
-BASE_URL = "http://localhost:5000"
+BASE_URL = "http://localhost:5001"
 
 
 class SpamDetectorClient:
@@ -240,20 +240,20 @@ def exemplo_6_api_rest_com_curl():
     
     print("""
 Classificar uma mensagem:
-$ curl -X POST http://localhost:5000/predict \\
+$ curl -X POST http://localhost:5001/predict \\
   -H "Content-Type: application/json" \\
   -d '{"text": "Click here to win money!"}'
 
 Enviar mensagem (com bloqueio de spam):
-$ curl -X POST http://localhost:5000/send \\
+$ curl -X POST http://localhost:5001/send \\
   -H "Content-Type: application/json" \\
   -d '{"message": "Hi how are you?", "recipient": "user@example.com"}'
 
 Obter métricas:
-$ curl http://localhost:5000/metrics
+$ curl http://localhost:5001/metrics
 
 Verificar saúde da API:
-$ curl http://localhost:5000/health
+$ curl http://localhost:5001/health
     """)
 
 
@@ -0,0 +1,41 @@
+import sys
+from app.utils.spam_detector import SpamDetector
+
+
+def main():
+    """
+    Converte spam_model.pkl / vectorizer.pkl para o formato em diretório
+    (arrays .npy mapeados em memória + manifest.json).
+    """
+    model_path = sys.argv[1] if len(sys.argv) > 1 else 'spam_model.pkl'
+    vectorizer_path = sys.argv[2] if len(sys.argv) > 2 else 'vectorizer.pkl'
+    output_path = sys.argv[3] if len(sys.argv) > 3 else 'spam_model'
+
+    detector = SpamDetector(model_path=model_path, vectorizer_path=vectorizer_path)
+    if not detector.is_loaded():
+        print(f"Modelo não encontrado em {model_path} / {vectorizer_path}")
+        sys.exit(1)
+
+    if detector.coef_ is None:
+        print("Apenas modelos lineares podem ser exportados")
+        sys.exit(1)
+
+    detector.model_path = output_path
+    detector.save_model()
+
+    # Conferir se o artefato responde igual ao modelo original
+    exported = SpamDetector(model_path=output_path)
+    samples = ["Click here to win $1000!", "Let's meet tomorrow at 3pm"]
+    for text in samples:
+        a = detector.predict(text)
+        b = exported.predict(text)
+        if a['label'] != b['label'] or abs(a['confidence'] - b['confidence']) > 1e-4:
+            print(f"Divergência ao exportar: {a} != {b}")
+            sys.exit(1)
+
+    print(f"\n✓ Modelo exportado para {output_path}/")
+    print(f"Use MODEL_PATH={output_path} para carregá-lo na API")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import multiprocessing
+import os
+
+# Configuração de produção: gunicorn -c gunicorn.conf.py wsgi:app
+# (modo ASGI: gunicorn -c gunicorn.conf.py -k uvicorn_worker.UvicornWorker asgi:app)
+# Cada valor pode ser ajustado por variável de ambiente.
+
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT') or 5001}"
+
+# Um worker por núcleo; as threads de cada worker atendem requisições
+# concorrentes (e alimentam os micro-lotes de predição)
+workers = int(os.environ.get('WEB_CONCURRENCY') or multiprocessing.cpu_count())
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+worker_class = 'gthread'
+
+# Carregar o app (e o modelo, ver wsgi.py) no mestre antes do fork
+preload_app = True
+
+# Reciclar cada worker depois de N requisições (0 desativa); o jitter evita
+# que todos reiniciem ao mesmo tempo
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS') or 10000)
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER') or 1000)
+
+# Segundos sem resposta antes de o worker ser reiniciado, e prazo para
+# terminar as requisições em andamento ao reiniciar/parar
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 30)
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT') or 30)
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE') or 5)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def worker_exit(server, worker):
+    # Gravar o que ainda está na fila do /send antes de o worker sair
+    # (max_requests, reload ou parada)
+    from app.services import write_queue
+    write_queue.flush()
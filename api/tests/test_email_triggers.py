@@ -0,0 +1,154 @@
+"""
+Contadores mantidos por triggers em `emails` (app/models/migrations.py):
+emails_changes (migração 3, ETag de GET /emails) e emails_daily_stats /
+emails_score_stats (migração 4, GET /emails/stats), conferidos contra uma
+recontagem direta da tabela.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app
+from app.models.email import db, EmailRecord
+from app.services import archive_service, email_service
+
+DAY = datetime(2025, 3, 10, 12, 0)
+
+
+@pytest.fixture
+def app():
+    # TestingConfig: SQLite em memória, banco novo a cada create_app
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def version():
+    return db.session.execute(text('SELECT version FROM emails_changes WHERE id = 1')).scalar_one()
+
+
+def add(subject, received=DAY, is_spam=False, spam_score=0.1):
+    return email_service.create_email('a@x.com', 'b@x.com', subject, 'corpo', is_spam, spam_score,
+                                      received=received)
+
+
+def daily_stats():
+    rows = db.session.execute(text(
+        'SELECT day, total, spam, score_sum FROM emails_daily_stats ORDER BY day'
+    )).all()
+    return [(day, total, spam, pytest.approx(score)) for day, total, spam, score in rows]
+
+
+def score_stats():
+    rows = db.session.execute(text(
+        'SELECT bucket, total, spam FROM emails_score_stats WHERE total > 0 ORDER BY bucket'
+    )).all()
+    return [tuple(row) for row in rows]
+
+
+def recount():
+    daily = db.session.execute(text(
+        'SELECT date(received), COUNT(*), SUM(is_spam), SUM(spam_score) FROM emails GROUP BY 1 ORDER BY 1'
+    )).all()
+    buckets = db.session.execute(text(
+        'SELECT MAX(0, MIN(9, CAST(spam_score * 10 AS INTEGER))), COUNT(*), SUM(is_spam) '
+        'FROM emails GROUP BY 1 ORDER BY 1'
+    )).all()
+    return [tuple(row) for row in daily], [tuple(row) for row in buckets]
+
+
+def assert_stats_match_table():
+    daily, buckets = recount()
+    assert daily_stats() == daily
+    assert score_stats() == buckets
+
+
+def test_changes_version_counts_every_write(app):
+    start = version()
+    first = add('um')
+    second = add('dois')
+    assert version() == start + 2
+
+    first.subject = 'um (editado)'
+    db.session.commit()
+    assert version() == start + 3
+
+    db.session.delete(second)
+    db.session.commit()
+    assert version() == start + 4
+
+    # Leituras não mexem no contador
+    email_service.list_emails(limit=10)
+    assert version() == start + 4
+
+
+def test_changes_version_counts_bulk_rows(app):
+    start = version()
+    records = [dict(sender='a', recipient='b', subject=f'm{i}', body='x', is_spam=False, spam_score=0.0)
+               for i in range(5)]
+    inserted, errors = email_service.bulk_create_emails(list(enumerate(records)))
+    assert (inserted, errors) == (5, [])
+    assert version() == start + 5
+
+
+def test_stats_follow_insert_update_delete(app):
+    ham = add('ham', spam_score=0.05)
+    spam = add('spam', is_spam=True, spam_score=0.95)
+    add('outro dia', received=DAY - timedelta(days=1), spam_score=0.42)
+    assert_stats_match_table()
+    assert daily_stats() == [('2025-03-09', 1, 0, pytest.approx(0.42)),
+                             ('2025-03-10', 2, 1, pytest.approx(1.0))]
+
+    # Reclassificação muda de faixa e de contagem de spam
+    ham.is_spam, ham.spam_score = True, 0.81
+    db.session.commit()
+    assert_stats_match_table()
+
+    # Mudança de dia move a linha no histograma
+    spam.received = DAY + timedelta(days=2)
+    db.session.commit()
+    assert_stats_match_table()
+
+    # Alterar só o assunto não mexe nos agregados
+    before = (daily_stats(), score_stats())
+    ham.subject = 'novo assunto'
+    db.session.commit()
+    assert (daily_stats(), score_stats()) == before
+
+    db.session.delete(spam)
+    db.session.commit()
+    assert_stats_match_table()
+    assert '2025-03-12' not in [row[0] for row in daily_stats()]
+
+
+def test_stats_match_get_stats(app):
+    for i in range(20):
+        add(f'm{i}', received=DAY + timedelta(hours=i * 5), is_spam=i % 4 == 0, spam_score=i / 20)
+    stats = email_service.get_stats()
+    assert stats['total'] == 20
+    assert stats['spam'] == 5
+    assert stats['avg_spam_score'] == pytest.approx(sum(i / 20 for i in range(20)) / 20)
+    assert sum(b['total'] for b in stats['score_distribution']) == 20
+    assert sum(d['total'] for d in stats['daily']) == 20
+
+
+def test_archived_emails_stay_in_stats(app, tmp_path):
+    # Migração 7: arquivar não desconta, apagar desconta
+    for i in range(5):
+        add(f'antigo {i}', received=DAY, is_spam=i == 0, spam_score=0.2 * i)
+    newest = add('novo', received=datetime.now())
+    before = (daily_stats(), score_stats())
+    start = version()
+
+    archive_service._archive_batch(datetime.now() - timedelta(days=30), str(tmp_path), 100)
+    assert EmailRecord.query.count() == 1
+    assert (daily_stats(), score_stats()) == before
+    # O ETag muda mesmo assim: a listagem perdeu linhas
+    assert version() == start + 5
+
+    db.session.delete(newest)
+    db.session.commit()
+    assert email_service.get_stats()['total'] == 5
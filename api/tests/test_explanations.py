@@ -0,0 +1,127 @@
+"""
+SpamDetector.predict_with_explanation_batch comparado com uma referência
+linha a linha (laço simples sobre os não nulos de cada mensagem).
+"""
+
+import numpy as np
+import pytest
+
+from app.utils.spam_detector import SpamDetector
+
+SPAM = [
+    'win free money now', 'claim your free prize today', 'urgent offer click here to win',
+    'free entry win cash prize', 'call now to claim your reward', 'you won a free vacation click',
+    'cheap loans click now', 'winner claim cash now', 'limited offer free gift card',
+    'text win to claim prize', 'exclusive deal buy now cheap', 'congratulations you won cash',
+]
+HAM = [
+    'are we still meeting tomorrow', 'can you send me the report', 'lunch at noon with the team',
+    'see you at the office later', 'thanks for the help yesterday', 'call me when you get home',
+    'the meeting moved to friday', 'did you finish the slides', 'happy birthday see you tonight',
+    'please review the document', 'dinner with family tonight', 'let me know when you arrive',
+]
+
+TEXTS = [
+    # sinais dos dois lados
+    'win free money at the meeting tomorrow, call me when you get home',
+    'claim your prize and send me the report',
+    # menos palavras que k
+    'free',
+    'see you',
+    # linhas vazias: texto vazio, só palavras fora do vocabulário, só pontuação
+    '',
+    'zzzz qqqq',
+    '!!! ???',
+    # muitas palavras
+    ' '.join(SPAM + HAM),
+]
+
+
+@pytest.fixture(scope='module', params=['pickle', 'artifact'])
+def detector(request, tmp_path_factory):
+    tmp = tmp_path_factory.mktemp(request.param)
+    if request.param == 'pickle':
+        model_path, vectorizer_path = str(tmp / 'model.pkl'), str(tmp / 'vectorizer.pkl')
+    else:
+        model_path, vectorizer_path = str(tmp / 'model'), None
+    trained = SpamDetector(model_path, vectorizer_path, autoload=False, backend='linear_svc')
+    trained.train(SPAM * 3 + HAM * 3, ['spam'] * len(SPAM) * 3 + ['ham'] * len(HAM) * 3)
+    trained.save_model()
+    # Recarregado do disco: o artefato usa o MappedVectorizer (tokens em bytes)
+    return SpamDetector(model_path, vectorizer_path)
+
+
+def row_items(det, text):
+    """(palavra, peso, contribuição) de cada não nulo da mensagem, um por um"""
+    row = det.vectorizer.transform([text])
+    items = []
+    for index, value in zip(row.indices.tolist(), row.data.tolist()):
+        weight = float(det.coef_[index])
+        items.append((det._token_names(np.array([index]))[0], weight, weight * value))
+    return items
+
+
+def reference(det, text, k):
+    """Explicação de uma mensagem sem vetorização entre linhas"""
+    items = row_items(det, text)
+    positive = sorted((i for i in items if i[2] > 0), key=lambda i: -i[2])[:k]
+    negative = sorted((i for i in items if i[2] < 0), key=lambda i: i[2])[:k]
+    return positive, negative
+
+
+def as_tuples(entries):
+    return [(e['word'], e['weight'], e['contribution']) for e in entries]
+
+
+def assert_same(actual, expected, items):
+    # Palavras com a mesma contribuição podem vir em qualquer ordem (e, no
+    # limite de k, qualquer uma delas): compara a sequência de contribuições
+    # e confere cada palavra contra os seus próprios valores na mensagem
+    assert [c for _, _, c in actual] == pytest.approx([c for _, _, c in expected], rel=1e-6)
+    assert len({w for w, _, _ in actual}) == len(actual)
+    by_word = {w: (wt, c) for w, wt, c in items}
+    for word, weight, contribution in actual:
+        assert by_word[word] == pytest.approx((weight, contribution), rel=1e-6)
+
+
+@pytest.mark.parametrize('k', [1, 3, 10])
+def test_batch_matches_per_row_loop(detector, k):
+    results = detector.predict_with_explanation_batch(TEXTS, k=k)
+    assert len(results) == len(TEXTS)
+    for text, result in zip(TEXTS, results):
+        positive, negative = reference(detector, text, k)
+        items = row_items(detector, text)
+        assert result['text'] == text
+        assert_same(as_tuples(result['top_positive']), positive, items)
+        assert_same(as_tuples(result['top_negative']), negative, items)
+
+        single = detector.predict(text)
+        assert result['label'] == single['label']
+        assert result['confidence'] == pytest.approx(single['confidence'])
+
+
+def test_mixed_sign_row_has_both_sides(detector):
+    result = detector.predict_with_explanation_batch([TEXTS[0]], k=3)[0]
+    assert result['top_positive'] and result['top_negative']
+    assert all(e['contribution'] > 0 for e in result['top_positive'])
+    assert all(e['contribution'] < 0 for e in result['top_negative'])
+
+
+def test_short_and_empty_rows(detector):
+    results = detector.predict_with_explanation_batch(['free', '', 'zzzz qqqq'], k=10)
+    assert len(results[0]['top_positive']) + len(results[0]['top_negative']) == 1
+    for result in results[1:]:
+        assert result['top_positive'] == [] and result['top_negative'] == []
+
+
+def test_single_explanation_matches_reference(detector):
+    for text in TEXTS:
+        explanation = detector.predict_with_explanation(text)['explanation']
+        items = row_items(detector, text)
+        # Top 10 por contribuição, sem separar o sinal
+        expected = sorted(items, key=lambda i: -i[2])[:10]
+        assert_same(as_tuples(explanation), expected, items)
+
+
+def test_empty_batch(detector):
+    assert detector.predict_with_explanation_batch([], k=5) == []
@@ -0,0 +1,21 @@
+import gc
+import os
+
+from app import create_app
+from app.models.email import db
+from app.services import spam_service
+
+# Ponto de entrada de produção: gunicorn -c gunicorn.conf.py wsgi:app
+# Com preload_app (gunicorn.conf.py) este módulo roda uma vez no processo
+# mestre, antes do fork: o modelo é carregado aqui e os workers compartilham
+# as mesmas páginas de memória (copy-on-write) em vez de cada um ter a sua cópia.
+app = create_app(os.getenv('FLASK_CONFIG') or 'production')
+
+with app.app_context():
+    spam_service.preload()
+    # As conexões abertas pelas migrações não podem ser herdadas pelos workers
+    db.engine.dispose()
+
+# Tirar do coletor de ciclos os objetos já criados (modelo, vocabulário):
+# assim o GC dos workers não escreve neles e as páginas continuam compartilhadas
+gc.freeze()
@@ -2,6 +2,7 @@ using System;
 using System.Collections.Generic;
 using System.Linq;
 using System.Threading.Tasks;
+using System.Net;
 using System.Net.Http;
 using System.Net.Http.Json;
 
@@ -17,17 +18,27 @@ namespace Email_Spam.Services
         public DateTime Received { get; set; }
         public bool IsSpam { get; set; }
         public double SpamScore { get; set; }
+        // A listagem traz só um trecho do corpo; o completo vem de GET /emails/{id}
+        public bool HasFullBody { get; set; } = true;
     }
 
     public class EmailService
     {
         private List<EmailMessage> _emails = new();
         private readonly HttpClient _http;
+        // Versão (ETag) e maior id já recebidos; permitem recarregar só o que mudou
+        private string? _etag;
+        private string? _syncToken;
+        // Cursor da próxima página (mais antiga) da listagem; null quando não há mais
+        private string? _nextCursor;
+        private const int PageSize = 100;
 
         public event Action? OnEmailsChanged;
         public event Action? OnLoadingChanged;
 
         public bool IsLoading { get; private set; } = false;
+        public bool IsLoadingMore { get; private set; } = false;
+        public bool HasMore => !string.IsNullOrEmpty(_nextCursor);
 
         public EmailService(HttpClient http)
         {
@@ -42,7 +53,8 @@ namespace Email_Spam.Services
             public string sender { get; set; } = "";
             public string recipient { get; set; } = "";
             public string subject { get; set; } = "";
-            public string body { get; set; } = "";
+            public string? body { get; set; }
+            public string snippet { get; set; } = "";
             public string received { get; set; } = "";
             public bool is_spam { get; set; }
             public double spam_score { get; set; }
@@ -54,27 +66,108 @@ namespace Email_Spam.Services
             OnLoadingChanged?.Invoke();
             try
             {
-                var records = await _http.GetFromJsonAsync<List<EmailDto>>("/emails");
-                if (records != null)
+                // Só a primeira página; as seguintes vêm sob demanda em LoadMoreAsync
+                using var resp = await _http.GetAsync($"/emails?limit={PageSize}");
+                resp.EnsureSuccessStatusCode();
+                var page = await resp.Content.ReadFromJsonAsync<List<EmailDto>>() ?? new List<EmailDto>();
+
+                _emails = page.Select(ToMessage).OrderByDescending(e => e.Received).ToList();
+                _etag = resp.Headers.ETag?.ToString();
+                _syncToken = GetHeader(resp, "X-Sync-Token");
+                _nextCursor = GetHeader(resp, "X-Next-Cursor");
+
+                OnEmailsChanged?.Invoke();
+            }
+            catch
+            {
+                // Silencioso; UI continuará funcionando com lista vazia
+            }
+            finally
+            {
+                IsLoading = false;
+                OnLoadingChanged?.Invoke();
+            }
+        }
+
+        public async Task LoadMoreAsync()
+        {
+            if (string.IsNullOrEmpty(_nextCursor) || IsLoadingMore) return;
+            IsLoadingMore = true;
+            OnLoadingChanged?.Invoke();
+            try
+            {
+                // Próxima página (mais antiga) a partir do cursor da anterior
+                using var resp = await _http.GetAsync($"/emails?limit={PageSize}&cursor={Uri.EscapeDataString(_nextCursor)}");
+                resp.EnsureSuccessStatusCode();
+                var page = await resp.Content.ReadFromJsonAsync<List<EmailDto>>() ?? new List<EmailDto>();
+
+                var known = _emails.Select(e => e.Id).ToHashSet();
+                _emails.AddRange(page.Where(r => !known.Contains(r.id)).Select(ToMessage));
+                _emails = _emails.OrderByDescending(e => e.Received).ToList();
+                _nextCursor = GetHeader(resp, "X-Next-Cursor");
+
+                OnEmailsChanged?.Invoke();
+            }
+            catch
+            {
+                // Silencioso; mantém o cursor para tentar de novo
+            }
+            finally
+            {
+                IsLoadingMore = false;
+                OnLoadingChanged?.Invoke();
+            }
+        }
+
+        private async Task SyncFromServerAsync()
+        {
+            IsLoading = true;
+            OnLoadingChanged?.Invoke();
+            try
+            {
+                // Só os emails inseridos depois do último carregamento; 304 se nada mudou
+                var records = new List<EmailDto>();
+                var token = _syncToken;
+                string? etag = null;
+                while (true)
                 {
-                    _emails = records.Select(r => new EmailMessage
+                    using var req = new HttpRequestMessage(HttpMethod.Get, $"/emails?limit=500&since_id={Uri.EscapeDataString(token!)}");
+                    if (etag == null && _etag != null)
+                    {
+                        req.Headers.TryAddWithoutValidation("If-None-Match", _etag);
+                    }
+                    using var resp = await _http.SendAsync(req);
+                    if (resp.StatusCode == HttpStatusCode.NotModified)
+                    {
+                        break;
+                    }
+                    resp.EnsureSuccessStatusCode();
+                    etag ??= resp.Headers.ETag?.ToString();
+                    var page = await resp.Content.ReadFromJsonAsync<List<EmailDto>>();
+                    if (page != null)
                     {
-                        Id = r.id,
-                        Sender = r.sender,
-                        Recipient = r.recipient,
-                        Subject = r.subject,
-                        Body = r.body,
-                        Received = string.IsNullOrEmpty(r.received) ? DateTime.MinValue : DateTime.Parse(r.received),
-                        IsSpam = r.is_spam,
-                        SpamScore = r.spam_score
-                    }).OrderByDescending(e => e.Received).ToList();
+                        records.AddRange(page);
+                    }
+                    token = GetHeader(resp, "X-Sync-Token") ?? token;
+                    if (!resp.Headers.Contains("Link"))
+                    {
+                        break;
+                    }
+                }
 
+                if (etag != null)
+                {
+                    var known = _emails.Select(e => e.Id).ToHashSet();
+                    _emails.AddRange(records.Where(r => !known.Contains(r.id)).Select(ToMessage));
+                    _emails = _emails.OrderByDescending(e => e.Received).ToList();
+                    _etag = etag;
+                    _syncToken = token;
                     OnEmailsChanged?.Invoke();
                 }
             }
             catch
             {
-                // Silencioso; UI continuará funcionando com lista vazia
+                // Silencioso; mantém a lista atual
             }
             finally
             {
@@ -83,6 +176,27 @@ namespace Email_Spam.Services
             }
         }
 
+        private static string? GetHeader(HttpResponseMessage resp, string name)
+        {
+            return resp.Headers.TryGetValues(name, out var values) ? values.FirstOrDefault() : null;
+        }
+
+        private static EmailMessage ToMessage(EmailDto r)
+        {
+            return new EmailMessage
+            {
+                Id = r.id,
+                Sender = r.sender,
+                Recipient = r.recipient,
+                Subject = r.subject,
+                Body = r.body ?? r.snippet,
+                HasFullBody = r.body != null,
+                Received = string.IsNullOrEmpty(r.received) ? DateTime.MinValue : DateTime.Parse(r.received),
+                IsSpam = r.is_spam,
+                SpamScore = r.spam_score
+            };
+        }
+
         public List<EmailMessage> GetEmails()
         {
             return _emails.OrderByDescending(e => e.Received).ToList();
@@ -130,7 +244,7 @@ namespace Email_Spam.Services
                             Sender = created.sender,
                             Recipient = created.recipient,
                             Subject = created.subject,
-                            Body = created.body,
+                            Body = created.body ?? "",
                             Received = string.IsNullOrEmpty(created.received) ? DateTime.MinValue : DateTime.Parse(created.received),
                             IsSpam = created.is_spam,
                             SpamScore = created.spam_score
@@ -149,9 +263,34 @@ namespace Email_Spam.Services
             return null;
         }
 
+        public async Task LoadBodyAsync(EmailMessage email)
+        {
+            if (email.HasFullBody) return;
+            try
+            {
+                var full = await _http.GetFromJsonAsync<EmailDto>($"/emails/{email.Id}");
+                if (full?.body != null)
+                {
+                    email.Body = full.body;
+                    email.HasFullBody = true;
+                }
+            }
+            catch
+            {
+                // Mantém o trecho se a API não responder
+            }
+        }
+
         public async Task ReloadAsync()
         {
-            await LoadFromServerAsync();
+            if (_syncToken == null)
+            {
+                await LoadFromServerAsync();
+            }
+            else
+            {
+                await SyncFromServerAsync();
+            }
         }
 
         public void DeleteEmail(EmailMessage email)